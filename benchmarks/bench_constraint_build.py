@@ -0,0 +1,352 @@
+"""
+Constraint building benchmark.
+
+Compares building the coloring and supply chain examples with one ``addConstr`` per
+row (the builders of the examples) against declaring every constraint family as a
+sparse coefficient matrix added with ``ModelBuilder.add_matrix_constrs``. Building
+does not need a full Gurobi license. Run it with::
+
+    python benchmarks/bench_constraint_build.py
+"""
+import time
+from collections import defaultdict
+from itertools import product
+from random import Random
+
+import gurobipy as gp
+import numpy as np
+
+from opt_sugar.extra_sugar import ModelBuilder
+from opt_sugar.extra_sugar.matrix import sparse_matrix, var_indices
+
+
+def coloring_data(node_count, edge_probability=0.3, seed=0):
+    rng = Random(seed)
+    nodes = set(range(node_count))
+    edges = {
+        (v1, v2)
+        for v1, v2 in product(nodes, nodes)
+        if v1 > v2 and rng.random() <= edge_probability
+    }
+    edges.add((1, 0))
+    return {"nodes": nodes, "edges": edges}
+
+
+def supply_chain_data(customer_count, day_count, seed=0):
+    rng = Random(seed)
+    accessories = ["shorts", "capes", "helmets", "hammers"]
+    recipe = {
+        "superman": {"shorts": 1, "capes": 1, "helmets": 0, "hammers": 0},
+        "thor": {"shorts": 0, "capes": 1, "helmets": 1, "hammers": 1},
+    }
+    return {
+        "demand": {
+            f"customer_{customer}": {
+                "date": rng.randint(1, day_count),
+                **{prod: rng.randint(0, 3) for prod in recipe},
+            }
+            for customer in range(customer_count)
+        },
+        "production": {
+            accessory: {str(day): rng.randint(0, 10) for day in range(1, day_count + 1)}
+            for accessory in accessories
+        },
+        "initial_inventory": {accessory: 0 for accessory in accessories},
+        "inventory_capacity": {accessory: 20 for accessory in accessories},
+        "max_delay": 3,
+        "recipe": recipe,
+    }
+
+
+class ColoringModelBuilder(ModelBuilder):
+    """Coloring example builder, one addConstr per constraint"""
+
+    def build_variables(self, base_model):
+        degrees = defaultdict(int)
+        for v1, v2 in self.data["edges"]:
+            degrees[v1] += 1
+            degrees[v2] += 1
+        self.degree = max(degrees.values())
+        color_keys = list(product(self.data["nodes"], range(self.degree)))
+        color = base_model.addVars(color_keys, vtype="B", name="color")
+        max_color = base_model.addVar(lb=0, ub=self.degree, vtype="C", name="max_color")
+        self.variables = {"color": color, "max_color": max_color}
+
+    def build_constraints(self, base_model):
+        color = self.variables["color"]
+        for v1, c in color:
+            for v2 in self.data["nodes"]:
+                if (v2, v1) in self.data["edges"] or (v1, v2) in self.data["edges"]:
+                    base_model.addConstr(
+                        color[v2, c] <= 1 - color[v1, c], name=f"color_{c}_{v1}_{v2}"
+                    )
+        for v in self.data["nodes"]:
+            base_model.addConstr(
+                gp.quicksum(color[v, c] for c in range(self.degree)) == 1,
+                name=f"every_node_has_color_{v}",
+            )
+        max_color = self.variables["max_color"]
+        for v, c in color:
+            base_model.addConstr(c * color[v, c] <= max_color, name=f"max_color_{v}_{c}")
+
+    def build_objective(self, base_model):
+        base_model.setObjective(self.variables["max_color"], gp.GRB.MINIMIZE)
+
+
+class MatrixColoringModelBuilder(ColoringModelBuilder):
+    """Same model, every constraint family is a sparse matrix over all the variables"""
+
+    def __init__(self, data, names=False):
+        super().__init__(data)
+        self.names = names
+
+    def build_constraints(self, base_model):
+        nodes = list(self.data["nodes"])  # row order of the color variables
+        color = var_indices(self.variables["color"]).reshape(len(nodes), self.degree)
+        max_color = self.variables["max_color"].index
+        position = {node: row for row, node in enumerate(nodes)}
+        edges = np.array([(position[v1], position[v2]) for v1, v2 in self.data["edges"]])
+        # color[v2, c] + color[v1, c] <= 1, added for both directions like the loop
+        edges = np.concatenate([edges, edges[:, ::-1]])
+        cols = np.stack([color[edges[:, 1]], color[edges[:, 0]]], axis=-1).reshape(-1, 2)
+        self._add(base_model, cols, np.ones(cols.shape), "<", 1, "color")
+        # every node has a color
+        self._add(base_model, color, np.ones(color.shape), "=", 1, "every_node_has_color")
+        # c * color[v, c] - max_color <= 0
+        cols = np.stack([color.ravel(), np.full(color.size, max_color)], axis=-1)
+        colors = np.tile(np.arange(self.degree), len(nodes))
+        values = np.stack([colors, -np.ones(color.size)], axis=-1)
+        self._add(base_model, cols, values, "<", 0, "max_color")
+
+    def _add(self, base_model, cols, values, sense, rhs, name):
+        """Adds one row per row of cols, with the given coefficients"""
+        rows = np.arange(len(cols)).repeat(cols.shape[1])
+        matrix = sparse_matrix(
+            rows, cols.ravel(), values.ravel(), (len(cols), base_model.NumVars)
+        )
+        name = name if self.names else None
+        self.add_matrix_constrs(base_model, matrix, None, sense, rhs, name=name)
+
+
+class SupplyChainModelBuilder(ModelBuilder):
+    """Supply chain example builder, one addConstr per constraint"""
+
+    def __init__(self, data):
+        super().__init__(data)
+        self.customers = list(data["demand"])
+        self.accessories = list(data["initial_inventory"])
+        self.products = list(data["recipe"])
+        max_day = max(details["date"] for details in data["demand"].values())
+        self.days = range(1, max_day + 1)
+        self.customer_dates = sorted(
+            (customer, day)
+            for customer in self.customers
+            for day in range(
+                data["demand"][customer]["date"],
+                min(data["demand"][customer]["date"] + data["max_delay"], max_day + 1),
+            )
+        )
+
+    def build_variables(self, base_model):
+        flows = list(product(self.customers, self.products, self.accessories, self.days))
+        stocks = list(product(self.accessories, self.days))
+        self.variables = {
+            "dispatch": base_model.addVars(self.customer_dates, vtype="B", name="dispatch"),
+            "inventory": base_model.addVars(stocks, name="inventory"),
+            "from_inventory": base_model.addVars(flows, vtype="I", name="from_inventory"),
+            "from_factory": base_model.addVars(flows, vtype="I", name="from_factory"),
+            "to_inventory": base_model.addVars(stocks, name="to_inventory"),
+            "extra_production": base_model.addVars(flows, name="extra_production"),
+        }
+
+    def build_constraints(self, base_model):
+        v = self.variables
+        production = self.data["production"]
+        demand = self.data["demand"]
+        recipe = self.data["recipe"]
+        for accessory, day in product(self.accessories, self.days):
+            base_model.addConstr(
+                v["to_inventory"][accessory, day] + v["from_factory"].sum("*", "*", accessory, day)
+                == production[accessory].get(str(day), 0),
+                name=f"production_allocation_{accessory}_{day}",
+            )
+        for accessory, day in product(self.accessories, self.days):
+            previous = (
+                self.data["initial_inventory"][accessory]
+                if day == 1
+                else v["inventory"][accessory, day - 1]
+            )
+            base_model.addConstr(
+                v["inventory"][accessory, day]
+                == previous
+                + v["to_inventory"][accessory, day]
+                - v["from_inventory"].sum("*", "*", accessory, day),
+                name=f"keeping_track_of_inventories_{accessory}_{day}",
+            )
+        for accessory, day in product(self.accessories, self.days):
+            base_model.addConstr(
+                v["inventory"][accessory, day] <= self.data["inventory_capacity"][accessory],
+                name=f"inventory_capacity_{accessory}_{day}",
+            )
+        for customer in self.customers:
+            base_model.addConstr(
+                v["dispatch"].sum(customer, "*") == 1, name=f"customer_served_{customer}"
+            )
+        for prod, accessory in product(self.products, self.accessories):
+            for customer, day in self.customer_dates:
+                base_model.addConstr(
+                    v["from_inventory"][customer, prod, accessory, day]
+                    + v["from_factory"][customer, prod, accessory, day]
+                    + v["extra_production"][customer, prod, accessory, day]
+                    == v["dispatch"][customer, day]
+                    * demand[customer][prod]
+                    * recipe[prod][accessory],
+                    name=f"demand_satisfaction_{customer}_{prod}_{accessory}_{day}",
+                )
+
+    def build_objective(self, base_model):
+        base_model.setObjective(2 * self.variables["extra_production"].sum(), gp.GRB.MINIMIZE)
+
+
+class MatrixSupplyChainModelBuilder(SupplyChainModelBuilder):
+    """Same model, every constraint family is a sparse matrix over all the variables"""
+
+    def __init__(self, data, names=False):
+        super().__init__(data)
+        self.names = names
+
+    def build_constraints(self, base_model):
+        v = self.variables
+        sizes = (len(self.customers), len(self.products), len(self.accessories), len(self.days))
+        stocks = sizes[2:]
+        from_inventory = var_indices(v["from_inventory"]).reshape(sizes)
+        from_factory = var_indices(v["from_factory"]).reshape(sizes)
+        extra_production = var_indices(v["extra_production"]).reshape(sizes)
+        inventory = var_indices(v["inventory"]).reshape(stocks)
+        to_inventory = var_indices(v["to_inventory"]).reshape(stocks)
+        dispatch = var_indices(v["dispatch"])
+        stock_rows = np.arange(np.prod(stocks)).reshape(stocks)
+        flow_rows = np.broadcast_to(stock_rows, sizes)
+
+        # to_inventory[a, d] + sum(from_factory[*, *, a, d]) == production[a][d]
+        production = np.array(
+            [
+                [self.data["production"][accessory].get(str(day), 0) for day in self.days]
+                for accessory in self.accessories
+            ]
+        )
+        self._add(
+            base_model,
+            [(stock_rows, to_inventory, 1.0), (flow_rows, from_factory, 1.0)],
+            "=",
+            production.ravel(),
+            "production_allocation",
+        )
+        # inventory[a, d] - inventory[a, d - 1] - to_inventory[a, d]
+        #     + sum(from_inventory[*, *, a, d]) == initial_inventory[a] on day 1, else 0
+        initial = np.zeros(stocks)
+        initial[:, 0] = [self.data["initial_inventory"][a] for a in self.accessories]
+        self._add(
+            base_model,
+            [
+                (stock_rows, inventory, 1.0),
+                (stock_rows[:, 1:], inventory[:, :-1], -1.0),
+                (stock_rows, to_inventory, -1.0),
+                (flow_rows, from_inventory, 1.0),
+            ],
+            "=",
+            initial.ravel(),
+            "keeping_track_of_inventories",
+        )
+        capacity = [self.data["inventory_capacity"][a] for a in self.accessories]
+        self._add(
+            base_model,
+            [(stock_rows, inventory, 1.0)],
+            "<",
+            np.repeat(capacity, stocks[1]),
+            "inventory_capacity",
+        )
+        # sum(dispatch[c, *]) == 1
+        customer_position = {customer: i for i, customer in enumerate(self.customers)}
+        dispatch_rows = np.array([customer_position[c] for c, _ in self.customer_dates])
+        self._add(base_model, [(dispatch_rows, dispatch, 1.0)], "=", 1.0, "customer_served")
+        # from_inventory + from_factory + extra_production
+        #     - demand[c][p] * recipe[p][a] * dispatch[c, d] == 0 for (c, d) in customer_dates
+        customer = dispatch_rows
+        day = np.array([d for _, d in self.customer_dates]) - 1
+        demand = np.array(
+            [[self.data["demand"][c][p] for p in self.products] for c in self.customers]
+        )
+        recipe = np.array(
+            [[self.data["recipe"][p][a] for a in self.accessories] for p in self.products]
+        )
+        rows = np.arange(len(dispatch) * sizes[1] * sizes[2]).reshape(sizes[1], sizes[2], -1)
+        cells = (customer, day)
+        flows = [
+            (rows, variables.transpose(1, 2, 0, 3)[:, :, cells[0], cells[1]], 1.0)
+            for variables in (from_inventory, from_factory, extra_production)
+        ]
+        requirement = demand.T[:, None, customer] * recipe[:, :, None]
+        flows.append((rows, np.broadcast_to(dispatch, rows.shape), -requirement))
+        self._add(base_model, flows, "=", 0.0, "demand_satisfaction")
+
+    def _add(self, base_model, blocks, sense, rhs, name):
+        """Adds the rows given as (rows, columns, coefficients) blocks with equal shapes"""
+        rows, cols, values = zip(
+            *(
+                (np.ravel(rows), np.ravel(cols), np.broadcast_to(values, np.shape(cols)).ravel())
+                for rows, cols, values in blocks
+            )
+        )
+        rows, cols, values = np.concatenate(rows), np.concatenate(cols), np.concatenate(values)
+        nonzero = values != 0
+        rows, cols, values = rows[nonzero], cols[nonzero], values[nonzero]
+        matrix = sparse_matrix(rows, cols, values, (rows.max() + 1, base_model.NumVars))
+        name = name if self.names else None
+        self.add_matrix_constrs(base_model, matrix, None, sense, rhs, name=name)
+
+
+def constraints_time(builder, env):
+    """Time of build_constraints, the variables are the same for both builders"""
+    with gp.Model(env=env) as model:
+        builder.build_variables(model)
+        model.update()
+        start = time.perf_counter()
+        builder.build_constraints(model)
+        model.update()
+        return time.perf_counter() - start, model.NumConstrs, model.NumNZs
+
+
+def main():
+    env = gp.Env(params={"OutputFlag": 0})
+    print(
+        f"{'model':>12} {'size':>5} {'constrs':>8} {'nonzeros':>9} {'loop (s)':>9} "
+        f"{'matrix (s)':>11} {'named (s)':>10}"
+    )
+    cases = [
+        ("coloring", size, coloring_data(size), ColoringModelBuilder, MatrixColoringModelBuilder)
+        for size in (50, 100, 200)
+    ]
+    cases += [
+        (
+            "supply_chain",
+            size,
+            supply_chain_data(size, size // 5),
+            SupplyChainModelBuilder,
+            MatrixSupplyChainModelBuilder,
+        )
+        for size in (100, 200, 400)
+    ]
+    for model_name, size, data, loop_builder, matrix_builder in cases:
+        loop, constrs, nonzeros = constraints_time(loop_builder(data), env)
+        matrix, *matrix_size = constraints_time(matrix_builder(data), env)
+        named, *_ = constraints_time(matrix_builder(data, names=True), env)
+        assert matrix_size == [constrs, nonzeros]
+        print(
+            f"{model_name:>12} {size:>5} {constrs:>8} {nonzeros:>9} {loop:>9.3f} "
+            f"{matrix:>11.3f} {named:>10.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
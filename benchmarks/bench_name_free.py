@@ -0,0 +1,63 @@
+"""
+Name-free build benchmark.
+
+Compares creating named variable groups and grouping results from the parsed names
+against name-free groups recorded in a ``low_sugar.registry.VarRegistry``. The solve
+is not part of the benchmark (values are zeros), so no full Gurobi license is
+needed. Run it with::
+
+    python benchmarks/bench_name_free.py
+"""
+import time
+
+import gurobipy as gp
+
+from opt_sugar.low_sugar import registry
+from opt_sugar.low_sugar.result import VarIndex
+
+
+def build(env, var_count, names):
+    model = gp.Model(env=env)
+    add_vars = registry.add_vars if names is False else gp.Model.addVars
+    for group in range(4):
+        add_vars(model, var_count // 400, 100, name=f"group_{group}")
+    model.update()
+    return model
+
+
+def group_from_names(model):
+    var_index = VarIndex(model.getAttr("VarName", model.getVars()))
+    return var_index.group([0.0] * model.NumVars)
+
+
+def group_from_registry(model):
+    var_index = registry.get_registry(model).var_index()
+    model.getVars()
+    return var_index.group([0.0] * model.NumVars)
+
+
+def main():
+    env = gp.Env(params={"OutputFlag": 0})
+    print(
+        f"{'vars':>9} {'named build (s)':>16} {'name-free build (s)':>20} "
+        f"{'names group (s)':>16} {'registry group (s)':>19}"
+    )
+    for var_count in (16_000, 64_000, 256_000, 1_024_000):
+        timings = []
+        for names, group in ((True, group_from_names), (False, group_from_registry)):
+            start = time.perf_counter()
+            model = build(env, var_count, names)
+            timings.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            group(model)
+            timings.append(time.perf_counter() - start)
+            model.dispose()
+        named_build, names_group, name_free_build, registry_group = timings
+        print(
+            f"{var_count:>9} {named_build:>16.3f} {name_free_build:>20.3f} "
+            f"{names_group:>16.3f} {registry_group:>19.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Objective aggregation benchmark.
+
+Compares folding ObjectivePart objects with ``sum`` (the previous BaseObjective.build)
+against the in-place accumulation of BaseObjective.build, for linear and quadratic
+parts. Building expressions does not need a full Gurobi license. Run it with::
+
+    python benchmarks/bench_objective_build.py
+"""
+import time
+
+import gurobipy as gp
+
+from opt_sugar.extra_sugar import BaseObjective, ObjectivePart
+
+
+def objective_parts(model, part_count, terms_per_part, quadratic=False):
+    x = model.addVars(part_count, terms_per_part, name="x")
+    model.update()
+    parts = []
+    for part in range(part_count):
+        expr = gp.quicksum(x[part, term] for term in range(terms_per_part))
+        if quadratic and part % 10 == 0:
+            expr = expr + x[part, 0] * x[part, 0]
+        parts.append(ObjectivePart(weight=1 + part % 3, expr=expr))
+    return parts
+
+
+def fold_with_sum(parts):
+    return sum(parts, ObjectivePart(weight=1, expr=0))._expr
+
+
+def timeit(function, *args):
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    env = gp.Env(params={"OutputFlag": 0})
+    print(f"{'parts':>6} {'terms':>8} {'quad':>5} {'sum (s)':>9} {'build (s)':>10}")
+    for part_count in (500, 1_000, 2_000, 4_000):
+        for quadratic in (False, True):
+            with gp.Model(env=env) as model:
+                parts = objective_parts(model, part_count, 20, quadratic)
+                fold = timeit(fold_with_sum, parts) if part_count <= 2_000 else float("nan")
+                build = timeit(BaseObjective(parts, hierarchy=1).build)
+                print(
+                    f"{part_count:>6} {20 * part_count:>8} {str(quadratic):>5} "
+                    f"{fold:>9.4f} {build:>10.4f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
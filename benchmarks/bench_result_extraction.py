@@ -0,0 +1,64 @@
+"""
+Result extraction scaling benchmark.
+
+Compares the legacy per-variable regex extraction of ``low_sugar.Model._get_result``
+against ``VarIndex`` on synthetic variable names, so no Gurobi license is needed.
+Run it with::
+
+    python benchmarks/bench_result_extraction.py
+"""
+import re
+import time
+from collections import defaultdict
+
+from opt_sugar.low_sugar.result import VarIndex
+
+
+def synthetic_solution(var_count, group_count=4):
+    group_size = var_count // group_count
+    names = [
+        f"group_{group}[{i % 97},{i // 97},day]"
+        for group in range(group_count)
+        for i in range(group_size)
+    ]
+    values = [float(i % 3) for i in range(len(names))]
+    return names, values
+
+
+def legacy_group(names, values):
+    vars_ = defaultdict(dict)
+    for name, value in zip(names, values):
+        m = re.match(r"(?P<group_name>\w+)\[(?P<index>[\w|\,]+)\]", name)
+        index = tuple(int(ind) if ind.isdigit() else ind for ind in m["index"].split(","))
+        vars_[m["group_name"]] = {**vars_[m["group_name"]], index: value}
+    return dict(vars_)
+
+
+def bulk_group(names, values, var_index=None):
+    if var_index is None or not var_index.matches(names):
+        var_index = VarIndex(names)
+    return var_index.group(values)
+
+
+def timeit(function, *args):
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    print(f"{'vars':>9} {'legacy (s)':>11} {'bulk (s)':>10} {'cached (s)':>11} {'us/var':>7}")
+    for var_count in (1_000, 4_000, 16_000, 64_000, 256_000, 1_024_000):
+        names, values = synthetic_solution(var_count)
+        legacy = timeit(legacy_group, names, values) if var_count <= 16_000 else float("nan")
+        bulk = timeit(bulk_group, names, values)
+        var_index = VarIndex(names)
+        cached = timeit(bulk_group, names, values, var_index)
+        print(
+            f"{len(names):>9} {legacy:>11.4f} {bulk:>10.4f} {cached:>11.4f} "
+            f"{1e6 * bulk / len(names):>7.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+"""
+Build, solve and extraction benchmark suite.
+
+Builds and solves seeded coloring, sudoku and supply chain instances through
+``OptModel`` and times the build phases (see ``ModelBuilder.build``), the solve and
+the result extraction separately. The timings are the best of ``--repeats`` runs
+profiled without memory tracing, a further run records the Python allocation peak
+and the Gurobi memory of every phase. Every case runs in a fresh process, so its
+peak resident memory is recorded too.
+
+The scales go from about 10^3 variables ("small", solvable with a size limited
+license) to 10^6 variables ("large"), ``--no-solve`` only builds the models. Results
+are written as JSON with ``--output`` and compared against a previous output with
+``--baseline``, the exit code is 1 if a phase regressed. Run it with::
+
+    python benchmarks/bench_suite.py --scale small --output results.json
+    python benchmarks/bench_suite.py --scale small --baseline results.json
+"""
+import argparse
+import datetime
+import json
+import multiprocessing
+import platform
+import resource
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import gurobipy as gp
+import numpy as np
+
+from bench_constraint_build import SupplyChainModelBuilder, supply_chain_data
+from opt_sugar.extra_sugar import BaseObjective, ModelBuilder, Objective, ObjectivePart, OptModel
+from opt_sugar.low_sugar.profiler import make_profiler
+
+# Instance sizes of every case: nodes, sudoku order (order^6 variables) and customers
+SCALES = {
+    "small": {"coloring": 100, "sudoku": 3, "supply_chain": 10},
+    "medium": {"coloring": 20_000, "sudoku": 6, "supply_chain": 100},
+    "large": {"coloring": 200_000, "sudoku": 10, "supply_chain": 450},
+}
+# Changes below these floors are noise, they are never flagged as regressions
+MIN_SECONDS = 0.01
+MIN_BYTES = 1 << 20
+
+
+def coloring_data(node_count, average_degree=3, colors=5, seed=0):
+    """Random graph in the format of generate_graph_data (examples/utils/coloring.py),
+    the edges are sampled directly so large sparse graphs are generated in linear time"""
+    rng = np.random.default_rng(seed)
+    ends = rng.integers(0, node_count, size=(node_count * average_degree // 2, 2))
+    ends = np.sort(ends[ends[:, 0] != ends[:, 1]], axis=1)[:, ::-1]
+    edges = set(map(tuple, ends.tolist()))
+    edges.add((1, 0))  # Forcing the edge 1, 0 to avoid empty edges
+    return {"nodes": set(range(node_count)), "edges": edges, "colors": colors}
+
+
+def sudoku_data(order, clue_fraction=0.4, seed=0):
+    """Sudoku of order^2 x order^2 cells with a unique digit per row, column and box,
+    a fraction of the cells of a random solved grid are given as clues"""
+    rng = np.random.default_rng(seed)
+    size = order * order
+    rows = np.arange(size)
+    solved = (order * (rows[:, None] % order) + rows[:, None] // order + rows) % size
+    solved = rng.permutation(size)[solved]
+    solved = solved[_band_permutation(rng, order)][:, _band_permutation(rng, order)]
+    clues = np.argwhere(rng.random((size, size)) < clue_fraction)
+    return {
+        "order": order,
+        "clues": {(row, col): int(solved[row, col]) + 1 for row, col in clues.tolist()},
+    }
+
+
+def _band_permutation(rng, order):
+    """Shuffles the bands and the rows within every band, keeping the grid valid"""
+    return np.concatenate(
+        [band * order + rng.permutation(order) for band in rng.permutation(order)]
+    )
+
+
+class ColoringModelBuilder(ModelBuilder):
+    def build_variables(self, base_model):
+        nodes, colors = sorted(self.data["nodes"]), range(self.data["colors"])
+        self.color = self.add_vars(base_model, nodes, colors, vtype="B", name="color")
+        self.max_color = self.add_var(base_model, ub=self.data["colors"], name="max_color")
+
+    def build_constraints(self, base_model):
+        colors = range(self.data["colors"])
+        base_model.addConstrs(
+            (self.color.sum(node, "*") == 1 for node in self.data["nodes"]), name="one_color"
+        )
+        base_model.addConstrs(
+            (
+                self.color[v1, c] + self.color[v2, c] <= 1
+                for v1, v2 in self.data["edges"]
+                for c in colors
+            ),
+            name="conflict",
+        )
+        base_model.addConstrs(
+            (c * self.color[node, c] <= self.max_color for node, c in self.color),
+            name="max_color",
+        )
+
+    def build_objective(self, base_model):
+        objective = Objective([BaseObjective([ObjectivePart(1, self.max_color)], hierarchy=1)])
+        objective.set(base_model)
+        return objective
+
+
+class SudokuModelBuilder(ModelBuilder):
+    def build_variables(self, base_model):
+        cells = range(self.data["order"] ** 2)
+        digits = range(1, len(cells) + 1)
+        self.pick = self.add_vars(base_model, cells, cells, digits, vtype="B", name="pick")
+
+    def build_constraints(self, base_model):
+        order = self.data["order"]
+        cells = range(order**2)
+        digits = range(1, order**2 + 1)
+        base_model.addConstrs(
+            (self.pick.sum(row, col, "*") == 1 for row in cells for col in cells), name="cell"
+        )
+        base_model.addConstrs(
+            (self.pick.sum(row, "*", d) == 1 for row in cells for d in digits), name="row"
+        )
+        base_model.addConstrs(
+            (self.pick.sum("*", col, d) == 1 for col in cells for d in digits), name="col"
+        )
+        boxes = {
+            (box_row, box_col): [
+                (box_row * order + row, box_col * order + col)
+                for row in range(order)
+                for col in range(order)
+            ]
+            for box_row in range(order)
+            for box_col in range(order)
+        }
+        base_model.addConstrs(
+            (
+                gp.quicksum(self.pick[row, col, d] for row, col in boxes[box]) == 1
+                for box in boxes
+                for d in digits
+            ),
+            name="box",
+        )
+        base_model.addConstrs(
+            (self.pick[row, col, d] == 1 for (row, col), d in self.data["clues"].items()),
+            name="clue",
+        )
+
+    def build_objective(self, base_model):
+        objective = Objective([BaseObjective([ObjectivePart(1, 0)], hierarchy=1)])
+        objective.set(base_model)
+        return objective
+
+
+class SupplyChainObjectiveModelBuilder(SupplyChainModelBuilder):
+    """Supply chain example builder, returning its objective"""
+
+    def build_objective(self, base_model):
+        extra_production = ObjectivePart(2, self.variables["extra_production"].sum())
+        objective = Objective([BaseObjective([extra_production], hierarchy=1)])
+        objective.set(base_model)
+        return objective
+
+
+CASES = {
+    "coloring": (ColoringModelBuilder, lambda size, seed: coloring_data(size, seed=seed)),
+    "sudoku": (SudokuModelBuilder, lambda size, seed: sudoku_data(size, seed=seed)),
+    "supply_chain": (
+        SupplyChainObjectiveModelBuilder,
+        lambda size, seed: supply_chain_data(size, max(5, size // 5), seed=seed),
+    ),
+}
+
+
+def run_case(case, size, seed, repeats, solve, params):
+    """Phases of the case, run in a fresh process so its peak memory is its own"""
+    builder, generate = CASES[case]
+    data = generate(size, seed)
+    timed = [profile_run(builder, data, "time", solve, params) for _ in range(repeats)]
+    traced = profile_run(builder, data, True, solve, params)
+    phases = {
+        name: {
+            "duration": min(run[name]["duration"] for run in timed),
+            "python_peak": span["python_peak"],
+            "gurobi_memory": span["gurobi_memory"],
+        }
+        for name, span in traced.items()
+    }
+    sizes = traced["build_objective"]
+    return {
+        "case": case,
+        "size": size,
+        "seed": seed,
+        "num_vars": sizes["num_vars"],
+        "num_constrs": sizes["num_constrs"],
+        "num_nzs": sizes["num_nzs"],
+        "phases": phases,
+        "peak_rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+    }
+
+
+def profile_run(builder, data, profile, solve, params):
+    if solve:
+        opt_model = OptModel(model_builder=builder, profile=profile)
+        opt_model.fit(data, params=params)
+        return opt_model.profile_.summary()
+    profiler = make_profiler(profile)
+    builder(data).build(profiler=profiler).dispose()
+    return profiler.summary()
+
+
+def compare(results, baseline, threshold):
+    """Rows ``(case, size, phase, metric, baseline, current, ratio, regressed)`` of the
+    phases present in both outputs"""
+    reference = {(result["case"], result["size"]): result for result in baseline["results"]}
+    rows = []
+    for result in results["results"]:
+        previous = reference.get((result["case"], result["size"]), {}).get("phases", {})
+        for phase, stats in result["phases"].items():
+            for metric, floor in (("duration", MIN_SECONDS), ("python_peak", MIN_BYTES)):
+                old, new = previous.get(phase, {}).get(metric), stats[metric]
+                if old is None or new is None:
+                    continue
+                regressed = new > old * (1 + threshold) and new - old > floor
+                ratio = new / old if old else float("inf")
+                rows.append(
+                    (result["case"], result["size"], phase, metric, old, new, ratio, regressed)
+                )
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--cases", nargs="+", choices=list(CASES), default=list(CASES))
+    parser.add_argument("--scale", choices=list(SCALES), default="small")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--no-solve", action="store_true", help="only build the models")
+    parser.add_argument("--time-limit", type=float, default=60.0)
+    parser.add_argument("--output", help="JSON file the results are written to")
+    parser.add_argument("--baseline", help="JSON output of a previous run to compare with")
+    parser.add_argument(
+        "--threshold", type=float, default=0.2, help="relative slowdown flagged as regression"
+    )
+    args = parser.parse_args(argv)
+
+    params = {"OutputFlag": 0, "TimeLimit": args.time_limit}
+    results = {
+        "meta": {
+            "date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "gurobi": ".".join(map(str, gp.gurobi.version())),
+            "platform": platform.platform(),
+            "scale": args.scale,
+            "repeats": args.repeats,
+            "solve": not args.no_solve,
+        },
+        "results": [],
+    }
+    print(f"{'case':>12} {'size':>7} {'vars':>9} {'constrs':>9} {'phase':>17} {'time (s)':>9} "
+          f"{'py peak (MB)':>13}")
+    for case in args.cases:
+        size = SCALES[args.scale][case]
+        # A fresh process per case, gurobi environments are not fork safe
+        with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as executor:
+            result = executor.submit(
+                run_case, case, size, args.seed, args.repeats, not args.no_solve, params
+            ).result()
+        results["results"].append(result)
+        for phase, stats in result["phases"].items():
+            print(
+                f"{case:>12} {size:>7} {result['num_vars']:>9} {result['num_constrs']:>9} "
+                f"{phase:>17} {stats['duration']:>9.3f} {stats['python_peak'] / 2**20:>13.1f}"
+            )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+    if not args.baseline:
+        return 0
+    with open(args.baseline, encoding="utf-8") as file:
+        rows = compare(results, json.load(file), args.threshold)
+    print(f"\n{'case':>12} {'size':>7} {'phase':>17} {'metric':>11} {'baseline':>11} "
+          f"{'current':>11} {'ratio':>6}")
+    for case, size, phase, metric, old, new, ratio, regressed in rows:
+        flag = "  REGRESSION" if regressed else ""
+        print(
+            f"{case:>12} {size:>7} {phase:>17} {metric:>11} {old:>11.4g} {new:>11.4g} "
+            f"{ratio:>6.2f}{flag}"
+        )
+    return int(any(row[-1] for row in rows))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
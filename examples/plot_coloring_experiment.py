@@ -22,6 +22,7 @@ from mlflow.exceptions import MlflowException
 
 # import sys; sys.path.append('/Users/Juan.ChaconLeon/opt/opt-sugar/src')  # when running locally
 from opt_sugar import low_sugar
+from opt_sugar.low_sugar.sweep import parameter_grid
 
 # The generate_graph_data generates random graphs given a graph size and an edge probability.
 from utils.coloring import generate_graph_data
@@ -82,20 +83,22 @@ except MlflowException:
 # Generating a graph instance
 data = generate_graph_data(node_count=15, edge_probability=0.5)
 
-# Building
-for mip_focus, _ in product([0, 1, 2, 3], range(25)):
-    with mlflow.start_run(experiment_id=experiment_id):
-        build = get_build(mip_focus)
-        opt_model = low_sugar.Model(build)
-        result = opt_model.optimize(data=data, callback=callback)
-
-        # Note: Above is replacement for opt_model.fit(data, fit_callback) and opt_model.predict(data)
-        mlflow.log_param("MIPFocus", result["callback_result"]["MIPFocus"])
-        mlflow.log_metric("RunTime", result["callback_result"]["RunTime"])
-        mlflow.log_metric("color_count", result["callback_result"]["color_count"])
-
-        tracking_url_type_store = urlparse(mlflow.get_tracking_uri()).scheme
-        print(f"tracking_url_type_store: {tracking_url_type_store}")
+# Building once and solving the 4 x 25 runs concurrently, one core per run. Every
+# replication uses a different gurobi Seed.
+opt_model = low_sugar.Model(get_build(mip_focus=0))
+configs = parameter_grid({"MIPFocus": [0, 1, 2, 3]})
+if __name__ == "__main__":  # the sweep spawns worker processes
+    table = opt_model.sweep_params([data], configs, replications=25)
+    for mip_focus, runtime, color_count in zip(
+        table["MIPFocus"], table["runtime"], table["objective"]
+    ):
+        with mlflow.start_run(experiment_id=experiment_id):
+            mlflow.log_param("MIPFocus", mip_focus)
+            mlflow.log_metric("RunTime", runtime)
+            mlflow.log_metric("color_count", color_count)
+
+    tracking_url_type_store = urlparse(mlflow.get_tracking_uri()).scheme
+    print(f"tracking_url_type_store: {tracking_url_type_store}")
 
 # %%
 # MIPFocus effect Over Runtime Case 1: Different input data
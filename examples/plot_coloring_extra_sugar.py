@@ -86,7 +86,7 @@ class ColoringModelBuilder(ModelBuilder):
         max_color = self.variables["max_color"]
         objective_parts = [ObjectivePart(weight=1, expr=max_color)]
         objective = Objective([BaseObjective(objective_parts, hierarchy=1)])
-        base_model.setObjective(objective.build()[0], gp.GRB.MINIMIZE)
+        objective.set(base_model, gp.GRB.MINIMIZE)
         return objective
 
 
@@ -64,15 +64,17 @@ class SupplyChainBlendedModelBuilder(ModelBuilder):
 
     def build_variables(self, base_model):
         indices = self.indices
-        dispatch = base_model.addVars(
-            indices["customer_dates"], vtype="B", name="dispatch"
+        dispatch = self.add_vars(
+            base_model, indices["customer_dates"], vtype="B", name="dispatch"
         )
-        inventory = base_model.addVars(
+        inventory = self.add_vars(
+            base_model,
             product(indices["accessories"], indices["days"]),
             vtype="C",
             name="inventory",
         )
-        from_inventory = base_model.addVars(
+        from_inventory = self.add_vars(
+            base_model,
             product(
                 indices["customers"],
                 indices["products"],
@@ -82,7 +84,8 @@ class SupplyChainBlendedModelBuilder(ModelBuilder):
             vtype="I",
             name="from_inventory",
         )
-        from_factory = base_model.addVars(
+        from_factory = self.add_vars(
+            base_model,
             product(
                 indices["customers"],
                 indices["products"],
@@ -92,13 +95,15 @@ class SupplyChainBlendedModelBuilder(ModelBuilder):
             vtype="I",
             name="from_factory",
         )
-        to_inventory = base_model.addVars(
+        to_inventory = self.add_vars(
+            base_model,
             product(indices["accessories"], indices["days"]),
             vtype="C",
             name="to_inventory",
         )
 
-        extra_production = base_model.addVars(
+        extra_production = self.add_vars(
+            base_model,
             product(
                 indices["customers"],
                 indices["products"],
@@ -198,14 +203,10 @@ class SupplyChainBlendedModelBuilder(ModelBuilder):
         customers = self.indices["customers"]
         demand = self.data["demand"]
 
+        dispatch_day = {(customer, day): day for customer, day in dispatch}
         delay_penalty_costs = gp.quicksum(
-            gp.quicksum(
-                day * dispatch[customer, day]
-                for customer, day in dispatch
-                if customers == customer_
-            )
-            - demand[customer_]["date"]
-            for customer_ in customers
+            dispatch.prod(dispatch_day, customer, "*") - demand[customer]["date"]
+            for customer in customers
         )
         extra_production_costs = 2 * extra_production.sum()
 
@@ -215,7 +216,7 @@ class SupplyChainBlendedModelBuilder(ModelBuilder):
         ]
 
         objective = Objective([BaseObjective(objective_parts, hierarchy=1)])
-        base_model.setObjective(objective.build()[0], gp.GRB.MINIMIZE)
+        objective.set(base_model, gp.GRB.MINIMIZE)
         return objective
 
 
@@ -1,10 +1,21 @@
 from abc import abstractmethod
-import json
-import grblogtools as glt
+import functools
 from sklearn.utils.validation import check_is_fitted
 import gurobipy as gp
-from . import objective
-import tempfile
+import numpy as np
+from . import matrix, objective
+from .indexed import IndexedVars
+from ..low_sugar import aio, bindings, parallel, race, registry, sweep
+from ..low_sugar.callbacks import chain
+from ..low_sugar.cache import cache_key
+from ..low_sugar.env_pool import build_with_env, release_model
+from ..low_sugar.fingerprint import fingerprint
+from ..low_sugar.log_capture import NodeLogCapture
+from ..low_sugar.pool import SolutionPool
+from ..low_sugar.sensitivity import get_constr_index, read_sensitivity
+from ..low_sugar.profiler import make_profiler, span
+from ..low_sugar.low_sugar import RESULT_FORMATS
+from ..low_sugar.result import VarIndex
 
 
 class ModelBuilder:
@@ -13,6 +24,9 @@ class ModelBuilder:
     def __init__(self, data):
         self.data = data
         self.objective = None
+        # False for name-free builds (see OptModel var_names), builders should only
+        # name their constraints when it is True
+        self.names = True
 
     @abstractmethod
     def build_variables(self, base_model: gp.Model) -> None:
@@ -32,14 +46,49 @@ class ModelBuilder:
             f"{type(self).__name__} should implement build_objective!"
         )
 
-    def build(self, name="my_model"):
-        base_model = gp.Model(name)
-        self.build_variables(base_model)
-        base_model.update()
-        self.build_constraints(base_model)
-        base_model.update()
-        self.objective = self.build_objective(base_model)
-        base_model.update()
+    def bind(self, base_model: gp.Model, attr: str, items, values) -> bindings.Binding:
+        """Declares that ``attr`` ("RHS", "LB", "UB" or "Obj") of ``items`` is computed
+        from the data by ``values(data)``, so OptModel(keep_model=True) can update the
+        built model in place for new data instead of building it again."""
+        return bindings.bind(base_model, attr, items, values)
+
+    def add_vars(self, base_model: gp.Model, *indices, **kwargs) -> IndexedVars:
+        """Drop-in replacement of ``base_model.addVars``, the returned IndexedVars
+        answers wildcard select, sum and prod from hash indexes instead of scanning
+        every key. In name-free builds the name is recorded in the variable registry
+        of the model instead of being set (see low_sugar.registry)."""
+        if self.names:
+            return IndexedVars(base_model.addVars(*indices, **kwargs))
+        return IndexedVars(registry.add_vars(base_model, *indices, **kwargs))
+
+    def add_var(self, base_model: gp.Model, **kwargs) -> gp.Var:
+        """Same as ``base_model.addVar``, see add_vars"""
+        if self.names:
+            return base_model.addVar(**kwargs)
+        return registry.add_var(base_model, **kwargs)
+
+    def add_matrix_constrs(
+        self, base_model: gp.Model, A, x, sense: str, b, name=None
+    ) -> gp.MConstr:
+        """Adds a whole constraint family ``A @ x <sense> b`` from a coefficient matrix
+        (NumPy or SciPy sparse, see matrix.sparse_matrix) in a single call instead of
+        one addConstr per row. Rows are named ``name[row]`` only if name is given and
+        the build is not name-free."""
+        name = name if self.names else None
+        return matrix.add_matrix_constrs(base_model, A, x, sense, b, name)
+
+    def build(self, name="my_model", env=None, profiler=None):
+        """:param profiler: low_sugar.profiler.BuildProfiler recording every phase"""
+        base_model = gp.Model(name, env=env)
+        with span(profiler, "build_variables", base_model):
+            self.build_variables(base_model)
+            base_model.update()
+        with span(profiler, "build_constraints", base_model):
+            self.build_constraints(base_model)
+            base_model.update()
+        with span(profiler, "build_objective", base_model):
+            self.objective = self.build_objective(base_model)
+            base_model.update()
         return base_model
 
 
@@ -62,47 +111,455 @@ class OptModel:
     objective_value_: float
     fit_callback_data: dict
 
-    def __init__(self, *, model_builder):
+    # Attributes set by fit and stored in the result cache
+    cached_attributes = (
+        "vars_",
+        "objective_value_",
+        "fit_callback_data",
+        "objective",
+        "log_results",
+        "nodelog_progress",
+        "objective_values_",
+        "objective_runtimes_",
+        "solution_pool_",
+        "sensitivity_",
+    )
+
+    def __init__(
+        self,
+        *,
+        model_builder,
+        result_format="dict",
+        keep_model=False,
+        warm_start=None,
+        cache=None,
+        env_pool=None,
+        data_key="equal",
+        var_names=True,
+        profile=False,
+        model_store=None,
+        pool_size=None,
+        sensitivity=False,
+    ):
+        """
+        :param model_builder: ModelBuilder subclass
+        :param result_format: "dict" keeps ``vars_`` as ``{var_name: value}``, "columnar"
+            keeps it as ``{group: VarGroup}`` backed by NumPy arrays
+        :param keep_model: keeps the built model in ``model`` between fits, if the
+            builder declared bindings (see ModelBuilder.bind) the next fits only update
+            the bound attributes and re-optimize, warm starting from the previous solve
+        :param warm_start: low_sugar.WarmStartStore used to set MIP starts from the
+            previous solution of a model with the same name
+        :param cache: low_sugar result cache (e.g. MemoryCache), fit restores the cached
+            attributes when the data, model builder and params were already solved
+        :param env_pool: low_sugar.EnvPool, models are built in environments leased from it
+        :param data_key: how predict decides if the data changed since the last fit.
+            "equal" compares the data with ``==`` (unless it is the same object),
+            "identity" only checks it is the same object (in place changes are not
+            detected), a function ``data_key(data)`` returns a version key, e.g.
+            ``lambda data: data["version"]``, and "hash" compares structural hashes of
+            the data (see low_sugar.fingerprint), computed when predict needs them
+        :param var_names: False builds name-free models, ModelBuilder.add_vars records
+            the group and keys of the variables instead of naming them and ``vars_`` is
+            grouped from that record, "dict" keeps it as ``{group: {index: value}}``.
+            Names are set on demand with ``low_sugar.registry.apply_names(model)``,
+            e.g. before writing an LP file
+        :param profile: every solved fit records wall time, memory and model size of
+            the build phases, the solve and the extraction in ``profile_`` (a
+            low_sugar.profiler.BuildProfiler, see its to_chrome_trace), cache hits and
+            failed fits leave no ``profile_``. "time" does not trace memory, so the
+            timings are not slowed down
+        :param model_store: low_sugar.model_store.ModelStore, models are written to it
+            after being built and loaded from it (instead of running the model builder)
+            when the data fingerprint and the model builder (and its ``version``
+            attribute) match. Builders with non linear objective parts are not stored
+        :param pool_size: fit keeps up to pool_size solutions of the solution pool,
+            best first, in ``solution_pool_`` (a low_sugar.pool.SolutionPool, each
+            solution is grouped like ``vars_``). Gurobi keeps up to PoolSolutions
+            solutions, see PoolSearchMode
+        :param sensitivity: fits of continuous models keep the duals, reduced costs,
+            slacks and sensitivity ranges in ``sensitivity_``, grouped by variable
+            group and constraint family (see low_sugar.sensitivity.read_sensitivity).
+            It is None for MIP models and when gurobi did not compute them (e.g.
+            barrier solves without crossover)
+        """
+        if result_format not in RESULT_FORMATS:
+            raise ValueError(f"result_format should be one of {RESULT_FORMATS}")
         self.model_builder = model_builder
+        self.result_format = result_format
+        self.keep_model = keep_model
+        self.warm_start = warm_start
+        self.cache = cache
+        self.env_pool = env_pool
+        self.data_key = data_key
+        self.var_names = var_names
+        self.profile = profile
+        self.model_store = model_store
+        self.pool_size = pool_size
+        self.sensitivity = sensitivity
+        self._data_key = None
+        self._var_index = None
+        self._constr_index = None
+        self._model_builder = None
         self.data = None
         self.objective = None
         self.nodelog_progress = None
         self.log_results = None
         self.model = None
 
-    def fit(self, data, callback=None, log_file=None):
+    def fit(self, data, callback=None, log_file=None, params=None, solve_callback=None):
         """Builds and optimize the specific the model given the data
         Notice the model is not part of the class, so if we want to read attributes of the model
         it is needed. The callback will be executed after model optimization.
+        The gurobi params are set on the built model before optimizing and the
+        solve_callback ``(model, where)`` is passed to model.optimize.
+        The node log is captured in memory into nodelog_progress, the log is only
+        written to disk and parsed with grblogtools into log_results if a log_file is
+        given.
         """
         self.data = data
+        self._data_key = None
+        self._clear_results()
+        profiler = make_profiler(self.profile)
+        key = None
+        if self.cache is not None:
+            key = self._cache_key(
+                data,
+                params,
+                result_format=self.result_format,
+                var_names=self.var_names,
+                pool_size=self.pool_size,
+                sensitivity=self.sensitivity,
+                callback=callback,
+                solve_callback=solve_callback,
+            )
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.__dict__.update(cached)
+                return self
         # TODO: add some checks over data here may be feasibility
-        model_builder = self.model_builder(data)
-        model = model_builder.build()
+        model_builder, model = self._build(data, profiler)
+        try:
+            optimal = self._fit(
+                model_builder, model, callback, log_file, params, solve_callback, profiler
+            )
+        finally:
+            if model is not self.model:
+                release_model(model)
+            del model
+        # Fits stopped early (e.g. by a TimeLimit) are not reused
+        if key is not None and optimal and hasattr(self, "vars_"):
+            self.cache.put(key, {
+                attribute: getattr(self, attribute)
+                for attribute in self.cached_attributes
+                if hasattr(self, attribute)
+            })
+        if profiler is not None:
+            self.profile_ = profiler
+        return self
 
-        with open(log_file, mode='w+b') if log_file else tempfile.NamedTemporaryFile() as file:
-            model.setParam('LogFile', file.name)
-            model.optimize()
-            self.log_results = glt.parse([file.name])
+    def _fit(self, model_builder, model, callback, log_file, params, solve_callback, profiler):
+        for param, value in (params or {}).items():
+            model.setParam(param, value)
+        warm_started = self.warm_start.apply(model) if self.warm_start else False
 
-        self.objective = json.loads(model_builder.objective.__repr__())
+        log_capture = NodeLogCapture()
+        tracker = objective.MultiObjectiveTracker() if model.NumObj > 1 else None
+        if log_file:
+            # gurobi appends to an existing log file, only this fit should be parsed
+            open(log_file, mode='wb').close()  # pylint: disable=consider-using-with
+            model.setParam('LogFile', log_file)
+        with span(profiler, "optimize", model):
+            model.optimize(
+                chain(log_capture.callback, tracker and tracker.callback, solve_callback)
+            )
+        self.nodelog_progress = log_capture.progress()
+        if log_file:
+            import grblogtools as glt  # pylint: disable=import-outside-toplevel
+
+            model.setParam('LogFile', "")
+            self.log_results = glt.parse([log_file])
+        if self.warm_start:
+            self.warm_start.record(model, warm_started)
+
+        # The part values are evaluated here, they can not be computed lazily once the
+        # model is released. The summary only counts terms, expressions are not dumped
+        self.objective = model_builder.objective.summary()
 
         try:
-            self.vars_ = {v.var_name: v.x for v in model.getVars()}
+            with span(profiler, "extract", model):
+                self.vars_ = self._get_vars(model)
+                if self.pool_size:
+                    self.solution_pool_ = self._get_pool(model)
+                if self.sensitivity:
+                    self.sensitivity_ = self._get_sensitivity(model)
             self.objective_value_ = model.getObjective().getValue()
+            if tracker:
+                self.objective_values_ = _objective_values(model)
+                self.objective_runtimes_ = tracker.runtimes()
+            else:
+                self.objective_values_ = [self.objective_value_]
+                self.objective_runtimes_ = [model.Runtime]
             if callback:
                 self.fit_callback_data = callback(model)
         except Exception:
-            del self.vars_, self.objective_value_, self.fit_callback_data
+            self._clear_results()
+            raise
+        return model.Status == gp.GRB.OPTIMAL
+
+    def sweep_weights(self, data, weights_grid, level=0, params=None):
+        """Optimizes the model for every weight vector of weights_grid (one weight per
+        objective part of the given level). The model is built once, or the kept one
+        is reused, and its objective is re-weighted in place so every point warm
+        starts from the previous one. The objective is restored afterwards.
+
+        :return: array with the objective part values of every grid point, shape
+            (points, parts)
+        """
+        model_builder, model = self._build(data)
+        try:
+            for param, value in (params or {}).items():
+                model.setParam(param, value)
+            levels = model_builder.objective.levels()
+            index = level if len(levels) > 1 else None
+            return levels[level].sweep(model, weights_grid, index)
         finally:
-            del model
+            if model is not self.model:
+                release_model(model)
+
+    def pareto_frontier(
+        self, data, n_points=11, method="weighted", processes=None, level=0, params=None
+    ):
+        """Approximates the Pareto frontier between the objective parts of the given
+        level, see objective.BaseObjective.pareto_frontier. The model is built once (or
+        a copy of the kept one is used, as its objective is replaced) and every point
+        warm starts from its neighbor.
+
+        :param method: "weighted" (weighted sums) or "epsilon" (epsilon constraints)
+        :param processes: worker processes solving chunks of points, each one reads a
+            copy of the model and uses its share of the cores
+        :return: array with the objective part values of the frontier points, shape
+            (points, parts)
+        """
+        model_builder, built = self._build(data)
+        model = built.copy() if built is self.model else built
+        try:
+            for param, value in (params or {}).items():
+                model.setParam(param, value)
+            return model_builder.objective.pareto_frontier(
+                model, level, n_points=n_points, method=method, processes=processes, params=params
+            )
+        finally:
+            if model is built:
+                release_model(model)
+            else:
+                model.dispose()
+
+    def sweep_params(self, datasets, configs, replications=1, threads=1, cores=None):
+        """Solves every data set with every gurobi parameter configuration, each
+        instance is built once. See low_sugar.sweep.sweep
+
+        :param configs: parameter sets, see low_sugar.sweep.parameter_grid and
+            low_sugar.sweep.random_configs
+        :return: table as ``{column: array}`` with the runtime, work, gap and
+            objective of every run
+        """
+        return sweep.sweep(
+            lambda data: self.model_builder(data).build(),
+            datasets,
+            configs,
+            replications,
+            threads,
+            cores,
+        )
+
+    def race(self, data, configs, target_gap=None, cores=None, share_incumbents=True):
+        """Builds the model once and solves copies of it with every gurobi parameter
+        configuration in parallel processes, the first one proving optimality (or
+        reaching target_gap) wins and the others are terminated. See
+        low_sugar.race.race
+
+        :param configs: parameter sets, e.g. ``[{"MIPFocus": 1}, {"Method": 2}]``
+        :return: self, ``race_`` has the position and params of the winning config, its
+            status and runtime
+        """
+        self.data = data
+        self._data_key = None
+        self._clear_results()
+        model_builder, model = self._build(data)
+        try:
+            model.update()
+            outcome = race.race(model, configs, target_gap, cores, share_incumbents)
+            values = outcome.pop("values")
+            if values is not None:
+                self.vars_ = self._get_vars(model, values)
+        except Exception:
+            self._clear_results()
+            raise
+        finally:
+            if model is not self.model:
+                release_model(model)
+        self.objective = model_builder.objective.summary(evaluate_expr=False)
+        self.objective_value_ = outcome["objective_value"]
+        self.race_ = outcome
         return self
 
+    async def aoptimize(self, data, callback=None, log_file=None, params=None, progress=None):
+        """Same as fit but runs the build and solve in the default executor of the
+        running event loop. Cancelling the task terminates the gurobi solve. Concurrent
+        solves should use separate OptModel instances.
+
+        :param progress: low_sugar.ProgressStream receiving incumbent, bound and gap events
+        """
+        solve = functools.partial(self.fit, data, callback, log_file, params)
+        return await aio.run_solve(solve, progress)
+
+    def _build(self, data, profiler=None):
+        if self.model is not None and bindings.get_bindings(self.model):
+            self._model_builder.data = data
+            with span(profiler, "update_bindings", self.model):
+                bindings.update(self.model, data)
+            return self._model_builder, self.model
+        self.reset()
+        model_builder = self.model_builder(data)
+        model_builder.names = self.var_names
+        model = build_with_env(
+            self.env_pool, lambda env: self._build_model(model_builder, env, profiler)
+        )
+        if self.keep_model:
+            self._model_builder, self.model = model_builder, model
+        return model_builder, model
+
+    def _build_model(self, model_builder, env, profiler):
+        if self.model_store is None:
+            return model_builder.build(env=env, profiler=profiler)
+        key = self._cache_key(model_builder.data, var_names=self.var_names)
+        if key is None:
+            return model_builder.build(env=env, profiler=profiler)
+        with span(profiler, "load_model") as context:
+            loaded = self.model_store.load(key, env)
+            if loaded is not None:
+                model, metadata = loaded
+                context["model"] = model
+                model_builder.objective = objective.Objective.from_terms(
+                    metadata["objective"], model
+                )
+        if loaded is not None:
+            return model
+        model = model_builder.build(env=env, profiler=profiler)
+        try:
+            objective_terms = model_builder.objective.to_terms()
+        except TypeError:  # non linear objective parts can not be restored
+            return model
+        with span(profiler, "save_model", model):
+            self.model_store.save(key, model, objective=objective_terms)
+        return model
+
+    def _clear_results(self):
+        for attribute in self.cached_attributes:
+            if attribute.endswith("_") or attribute == "fit_callback_data":
+                self.__dict__.pop(attribute, None)
+        # Neither is cached, a cache hit has no profile and only race sets race_
+        self.__dict__.pop("profile_", None)
+        self.__dict__.pop("race_", None)
+
+    def reset(self):
+        """Drops the kept model, the next fit builds it again"""
+        model = self.model
+        self._model_builder, self.model = None, None
+        release_model(model)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_model_builder"], state["model"], state["env_pool"] = None, None, None
+        return state
+
+    def fit_many(self, datasets, callback=None, params=None, max_workers=None, ordered=True):
+        """Fits a copy of this estimator for every data set in a pool of worker
+        processes, the cores are split between workers through the gurobi Threads
+        parameter. Worker processes are spawned, see low_sugar.parallel.
+
+        :return: list of fitted OptModel in input order if ordered, otherwise an
+            iterator of ``(position, fitted OptModel)`` tuples as they complete
+        """
+        kwargs = {"callback": callback, "params": params}
+        return parallel.solve_many(
+            self, "fit", datasets, kwargs, max_workers=max_workers, ordered=ordered
+        )
+
+    def _get_vars(self, model, values=None):
+        variables = model.getVars()
+        if values is None:
+            values = model.getAttr("X", variables)
+        elif self.result_format == "dict":
+            values = values.tolist()
+        var_index = registry.get_var_index(model)
+        if var_index is not None:
+            if self.result_format == "dict":
+                return var_index.group(values)
+            return var_index.columnar(np.array(values, dtype=float))
+        names = model.getAttr("VarName", variables)
+        if self.result_format == "dict":
+            return dict(zip(names, values))
+        if self._var_index is None or not self._var_index.matches(names):
+            self._var_index = VarIndex(names)
+        return self._var_index.columnar(np.array(values, dtype=float))
+
+    def _get_pool(self, model):
+        var_index = registry.get_var_index(model)
+        if var_index is not None:
+            kwargs = {"var_index": var_index}
+        elif self.result_format == "dict":
+            kwargs = {"names": model.getAttr("VarName", model.getVars())}
+        else:
+            kwargs = {"var_index": self._var_index}  # parsed by _get_vars
+        return SolutionPool.from_model(
+            model, self.pool_size, result_format=self.result_format, **kwargs
+        )
+
+    def _get_sensitivity(self, model):
+        if model.IsMIP:  # duals and ranges only exist for continuous models
+            return None
+        var_index = registry.get_var_index(model)
+        if var_index is None:
+            names = model.getAttr("VarName", model.getVars())
+            if self._var_index is None or not self._var_index.matches(names):
+                self._var_index = VarIndex(names)
+            var_index = self._var_index
+        self._constr_index = get_constr_index(model, self._constr_index)
+        return read_sensitivity(model, var_index, self._constr_index)
+
+    def _cache_key(self, data, params=None, **extra):
+        """Key of the fit in the cache or model store, the data is identified by its
+        version key or its fingerprint. None if the data can not be fingerprinted (e.g.
+        it holds locks), such fits are neither cached nor stored."""
+        if callable(self.data_key):
+            return cache_key(self.data_key(data), self.model_builder, params, **extra)
+        try:
+            data_key = fingerprint(data)
+            key = cache_key(data_key, self.model_builder, params, **extra)
+        except TypeError:
+            return None
+        if self.data_key == "hash" and data is self.data:
+            self._data_key = data_key
+        return key
+
+    def _data_changed(self, data) -> bool:
+        """Whether data differs from the fitted data according to data_key"""
+        if self.data_key == "equal":
+            return data is not self.data and data != self.data
+        if self.data_key == "identity":
+            return data is not self.data
+        key = fingerprint if self.data_key == "hash" else self.data_key
+        if self._data_key is None:
+            self._data_key = key(self.data)
+        return key(data) != self._data_key
+
     def predict(self, data, *args, **kwargs):
-        """Fits estimator if not fitted or self.data differs from data and returns the
-        variable values"""
-        fitted = [v for v in vars(self) if v.endswith("_") and not v.startswith("__")]
-        if not fitted or self.data != data:
+        """Fits estimator if not fitted or data differs from the fitted data (according
+        to data_key) and returns the variable values"""
+        if not hasattr(self, "vars_") or self._data_changed(data):
             self.fit(data, *args, **kwargs)
         return self.vars_
 
@@ -113,3 +570,12 @@ class OptModel:
         """Returns the spefic model objective given the data"""
         check_is_fitted(self)
         return self.objective_value_
+
+
+def _objective_values(model):
+    """Values of every objective of a multi-objective model, in objective index order"""
+    values = []
+    for index in range(model.NumObj):
+        model.params.ObjNumber = index
+        values.append(model.ObjNVal)
+    return values
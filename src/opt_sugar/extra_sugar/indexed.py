@@ -0,0 +1,105 @@
+from itertools import product
+
+import gurobipy as gp
+
+WILDCARD = "*"
+
+
+def _is_wildcard(value) -> bool:
+    return isinstance(value, str) and value == WILDCARD
+
+
+class IndexedVars(gp.tupledict):
+    """tupledict whose select, sum and prod look the matching keys up in hash indexes
+    instead of scanning every key, so wildcard sums inside loops over the other
+    dimensions (e.g. ``x.sum("*", "*", accessory, day)``) are not quadratic.
+
+    One index is built per pattern shape (which positions are fixed) the first time
+    it is used, later queries with that shape take time proportional to the number of
+    matches. Fixed positions can also be lists of values, missing trailing positions
+    match any value like in tupledict. Any change of the keys (assignment, del, pop,
+    update...) drops the indexes.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._indexes = {}
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self._indexes.clear()
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._indexes.clear()
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def pop(self, *args):
+        self._indexes.clear()
+        return super().pop(*args)
+
+    def popitem(self):
+        self._indexes.clear()
+        return super().popitem()
+
+    def setdefault(self, key, default=None):
+        self._indexes.clear()
+        return super().setdefault(key, default)
+
+    def update(self, *args, **kwargs):
+        self._indexes.clear()
+        super().update(*args, **kwargs)
+
+    def clear(self):
+        self._indexes.clear()
+        super().clear()
+
+    def __reduce__(self):
+        return type(self), (dict(self),)
+
+    def keys_matching(self, *pattern) -> list:
+        """Keys matching the pattern, "*" matches any value and a list any of its
+        values. Keys are grouped by the values of the list positions, in the order of
+        the lists, and in insertion order within a group."""
+        first = next(iter(self.keys()), None)
+        size = len(first) if isinstance(first, tuple) else 1
+        pattern += (WILDCARD,) * (size - len(pattern))
+        if all(_is_wildcard(value) for value in pattern):
+            return list(self.keys())
+        fixed = tuple(i for i, value in enumerate(pattern) if not _is_wildcard(value))
+        index = self._index(len(pattern), fixed)
+        choices = [
+            pattern[i] if isinstance(pattern[i], list) else (pattern[i],) for i in fixed
+        ]
+        if all(len(values) == 1 for values in choices):
+            return list(index.get(tuple(values[0] for values in choices), ()))
+        return [key for values in product(*choices) for key in index.get(values, ())]
+
+    def _index(self, size: int, fixed: tuple) -> dict:
+        index = self._indexes.get((size, fixed))
+        if index is None:
+            index = {}
+            for key in self.keys():
+                if not isinstance(key, tuple):
+                    key_tuple = (key,)
+                elif len(key) != size:
+                    continue
+                else:
+                    key_tuple = key
+                index.setdefault(tuple(key_tuple[i] for i in fixed), []).append(key)
+            self._indexes[size, fixed] = index
+        return index
+
+    def select(self, *pattern) -> list:
+        return [self[key] for key in self.keys_matching(*pattern)]
+
+    def sum(self, *pattern) -> gp.LinExpr:
+        return gp.quicksum(self.select(*pattern))
+
+    def prod(self, coeff: dict, *pattern) -> gp.LinExpr:
+        """Same as tupledict.prod, keys missing in coeff are skipped"""
+        keys = [key for key in self.keys_matching(*pattern) if key in coeff]
+        return gp.LinExpr([coeff[key] for key in keys], [self[key] for key in keys])
@@ -0,0 +1,43 @@
+from typing import Optional
+
+import gurobipy as gp
+import numpy as np
+
+
+def sparse_matrix(rows, cols, values, shape) -> "scipy.sparse.csr_matrix":  # noqa: F821
+    """CSR coefficient matrix from coordinate arrays, repeated (row, col) entries are
+    summed. Needs scipy."""
+    try:
+        from scipy import sparse
+    except ImportError as error:
+        raise ImportError(
+            "sparse_matrix needs scipy, install it with: pip install scipy"
+        ) from error
+    return sparse.csr_matrix((values, (rows, cols)), shape=shape)
+
+
+def add_matrix_constrs(
+    model: gp.Model, A, x, sense: str, b, name: Optional[str] = None
+) -> gp.MConstr:
+    """Adds the whole constraint family ``A @ x <sense> b`` with a single matrix call,
+    no expression object is created per row.
+
+    :param A: NumPy array or SciPy sparse matrix, one row per constraint
+    :param x: MVar, list of Var or tupledict (its values in insertion order) with one
+        variable per column of A, None uses all the model variables (column = Var.index)
+    :param sense: "<", "=" or ">" (or a NumPy array with one sense per row)
+    :param b: right hand side, scalar or one value per row
+    :param name: constraints are named ``name[row]`` by gurobi, unnamed if None
+    """
+    if isinstance(x, dict):
+        x = list(x.values())
+    b = np.broadcast_to(np.asarray(b, dtype=float), (A.shape[0],))
+    return model.addMConstr(A, x, sense, b, name="" if name is None else name)
+
+
+def var_indices(variables) -> np.ndarray:
+    """Columns (Var.index) of a tupledict (in insertion order) or list of variables, to
+    build matrices used with ``x=None``. The model should be updated first."""
+    if isinstance(variables, dict):
+        variables = variables.values()
+    return np.fromiter((var.index for var in variables), dtype=np.int64)
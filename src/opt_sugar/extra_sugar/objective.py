@@ -1,9 +1,18 @@
-from typing import Union, List, Iterable
+from typing import Union, List, Iterable, Optional, Sequence
+from numbers import Number
 import json
+import gurobipy as gp
+import numpy as np
+from . import pareto
+from .terms import LinearTerms, linear_terms, set_linear_objective, terms_values
 
 
-def pretty_json_str(json_str):
-    return json.dumps(json.loads(json_str.replace("'", '"')), indent=2, sort_keys=True)
+def pretty_json_str(summary: Union[dict, str]) -> str:
+    """Indented JSON of a summary, a JSON like string (single quotes allowed) is
+    parsed first"""
+    if isinstance(summary, str):
+        summary = json.loads(summary.replace("'", '"'))
+    return json.dumps(summary, indent=2, sort_keys=True)
 
 
 def is_jsonable(object_):
@@ -14,37 +23,153 @@ def is_jsonable(object_):
         return False
 
 
+def term_count(expr) -> int:
+    if isinstance(expr, gp.QuadExpr):
+        return expr.size() + expr.getLinExpr().size()
+    if isinstance(expr, gp.LinExpr):
+        return expr.size()
+    return 0 if isinstance(expr, Number) else 1
+
+
+def evaluate(expr) -> Optional[float]:
+    """Value of the expression in the current solution, None if there is none"""
+    if isinstance(expr, Number):
+        return float(expr)
+    try:
+        return expr.getValue() if hasattr(expr, "getValue") else expr.X
+    except (gp.GurobiError, AttributeError):
+        return None
+
+
 class ObjectivePart:
     def __init__(self, weight: float, expr):
         self._weight = weight
         self._expr = expr
+        self._terms = None
+
+    def terms(self) -> LinearTerms:
+        """Coefficients of the (linear) expression, extracted once and reused to
+        re-weight the objective in place."""
+        if self._terms is None:
+            self._terms = linear_terms(self._expr)
+        return self._terms
 
     def __add__(self, other):
         expr = self._weight * self._expr + other._weight * other._expr
         return ObjectivePart(weight=1, expr=expr)
 
+    def summary(self, evaluate_expr: bool = True, full_expr: bool = False) -> dict:
+        """Weight and term count of the part, plus its value in the current solution
+        if evaluate_expr, the whole expression is only stringified if full_expr."""
+        summary = {"weight": self._weight, "terms": term_count(self._expr)}
+        if evaluate_expr:
+            summary["value"] = evaluate(self._expr)
+        if full_expr:
+            summary["expr"] = str(self._expr)
+        return summary
+
     def __repr__(self):
-        return json.dumps(
-            {k: v if is_jsonable(v) else str(v) for k, v in self.__dict__.items()},
-            indent=2,
-            sort_keys=True,
-        )
+        return pretty_json_str(self.summary(evaluate_expr=False))
 
 
 class BaseObjective:
-    def __init__(self, objective_parts: List[ObjectivePart], hierarchy: int):
+    """Weighted sum of objective parts optimized at a hierarchy level, lower hierarchy
+    values are optimized first (1 is the most important level). weight, abstol and
+    reltol are used by gurobi's hierarchical multi-objective optimization, a level may
+    degrade the previous ones by up to the given tolerances."""
+
+    def __init__(
+        self,
+        objective_parts: List[ObjectivePart],
+        hierarchy: int,
+        weight: float = 1.0,
+        abstol: float = 1e-6,
+        reltol: float = 0.0,
+        name: Optional[str] = None,
+    ):
         self._objective_parts = objective_parts
         self._hierarchy = hierarchy
+        self._weight = weight
+        self._abstol = abstol
+        self._reltol = reltol
+        self._name = name or f"hierarchy_{hierarchy}"
 
     def build(self):
-        objective_parts_sum = sum(
-            (objective_part for objective_part in self._objective_parts),
-            ObjectivePart(weight=1, expr=0),
-        )
-        return objective_parts_sum._expr
+        """Weighted sum of the parts, accumulated in place so the build is linear in
+        the total number of terms"""
+        quadratic = any(isinstance(part._expr, gp.QuadExpr) for part in self._objective_parts)
+        expr = gp.QuadExpr() if quadratic else gp.LinExpr()
+        for part in self._objective_parts:
+            if isinstance(part._expr, Number):
+                expr.addConstant(part._weight * part._expr)
+            else:
+                expr.add(part._expr, part._weight)
+        return expr
+
+    def reweight(self, model: gp.Model, weights: Sequence[float], index: Optional[int] = None):
+        """Sets the objective coefficients of the model to the parts weighted by
+        ``weights`` with a bulk attribute update, the model is not rebuilt.
+
+        :param index: objective index of this level in a multi-objective model (see
+            Objective.set), None for single objective models
+        """
+        set_linear_objective(model, self.terms(), weights, index)
+
+    def terms(self) -> List[LinearTerms]:
+        return [part.terms() for part in self._objective_parts]
+
+    def part_values(self, model: gp.Model) -> np.ndarray:
+        """Value of every part in the current solution of the model"""
+        return terms_values(model, self.terms())
+
+    def sweep(self, model: gp.Model, weights_grid, index: Optional[int] = None) -> np.ndarray:
+        """Re-weights and re-optimizes the same model for every row of weights_grid,
+        each solve warm starts from the previous one. The parts get their own weights
+        back afterwards.
+
+        :return: array with the part values of every grid point, shape (points, parts)
+        """
+        weights_grid = list(weights_grid)
+        values = np.full((len(weights_grid), len(self._objective_parts)), np.nan)
+        try:
+            for point, weights in enumerate(weights_grid):
+                self.reweight(model, weights, index)
+                model.optimize()
+                if model.SolCount:
+                    values[point] = self.part_values(model)
+        finally:
+            self.reweight(model, [part._weight for part in self._objective_parts], index)
+        return values
+
+    def pareto_frontier(
+        self,
+        model: gp.Model,
+        n_points: int = 11,
+        method: str = "weighted",
+        processes: Optional[int] = None,
+        params: Optional[dict] = None,
+    ) -> np.ndarray:
+        """Non dominated trade-offs between the parts, the objective of the (single
+        objective) model is replaced. See pareto.pareto_frontier.
+
+        :return: array with the part values of every frontier point, shape (points, parts)
+        """
+        return pareto.pareto_frontier(model, self.terms(), n_points, method, processes, params)
+
+    def summary(self, evaluate_expr: bool = True, full_expr: bool = False) -> dict:
+        return {
+            "hierarchy": self._hierarchy,
+            "name": self._name,
+            "weight": self._weight,
+            "abstol": self._abstol,
+            "reltol": self._reltol,
+            "objective_parts": [
+                part.summary(evaluate_expr, full_expr) for part in self._objective_parts
+            ],
+        }
 
     def __repr__(self):
-        return pretty_json_str(str(self.__dict__))
+        return pretty_json_str(self.summary(evaluate_expr=False))
 
 
 class Objective:
@@ -57,5 +182,96 @@ class Objective:
         except TypeError:
             return self._base_objectives.build()
 
+    def levels(self) -> List[BaseObjective]:
+        """Base objectives sorted by hierarchy, the first one is optimized first"""
+        if isinstance(self._base_objectives, BaseObjective):
+            return [self._base_objectives]
+        return sorted(self._base_objectives, key=lambda level: level._hierarchy)
+
+    def to_terms(self) -> List[dict]:
+        """Picklable description of the levels with the parts as LinearTerms, restored
+        on another model with the same variables by from_terms. Raises TypeError for
+        non linear parts."""
+        return [
+            {
+                "hierarchy": level._hierarchy,
+                "weight": level._weight,
+                "abstol": level._abstol,
+                "reltol": level._reltol,
+                "name": level._name,
+                "parts": [(part._weight, part.terms()) for part in level._objective_parts],
+            }
+            for level in self.levels()
+        ]
+
+    @classmethod
+    def from_terms(cls, levels: List[dict], model: gp.Model) -> "Objective":
+        variables = model.getVars()
+        base_objectives = []
+        for level in levels:
+            level = dict(level)
+            parts = [
+                ObjectivePart(weight, terms.expr(variables))
+                for weight, terms in level.pop("parts")
+            ]
+            base_objectives.append(BaseObjective(parts, **level))
+        return cls(base_objectives)
+
+    def set(self, model: gp.Model, sense: int = gp.GRB.MINIMIZE) -> None:
+        """Sets the objective of the model. A single level is set with setObjective,
+        several levels are installed at once with setObjectiveN so gurobi solves them
+        lexicographically in a single optimize call. Levels with the same hierarchy
+        share a priority, gurobi blends them with their weights."""
+        levels = self.levels()
+        if len(levels) == 1:
+            model.setObjective(levels[0].build(), sense)
+            return
+        model.ModelSense = sense
+        max_hierarchy = levels[-1]._hierarchy
+        for index, level in enumerate(levels):
+            model.setObjectiveN(
+                level.build(),
+                index=index,
+                priority=max_hierarchy - level._hierarchy + 1,
+                weight=level._weight,
+                abstol=level._abstol,
+                reltol=level._reltol,
+                name=level._name,
+            )
+
+    def pareto_frontier(self, model: gp.Model, level: int = 0, **kwargs) -> np.ndarray:
+        """Pareto frontier between the parts of the given level, the other levels are
+        removed from the model. See BaseObjective.pareto_frontier."""
+        if model.NumObj > 1:
+            model.NumObj = 0
+        return self.levels()[level].pareto_frontier(model, **kwargs)
+
+    def summary(self, evaluate_expr: bool = True, full_expr: bool = False) -> dict:
+        """Compact description of every level, see ObjectivePart.summary"""
+        return {
+            "base_objectives": [
+                level.summary(evaluate_expr, full_expr) for level in self.levels()
+            ]
+        }
+
     def __repr__(self):
-        return pretty_json_str(str(self.__dict__))
+        return pretty_json_str(self.summary(evaluate_expr=False))
+
+
+class MultiObjectiveTracker:
+    """Gurobi MULTIOBJ callback recording when each hierarchy level finished, so the
+    runtime of every level is known after a hierarchical solve (one runtime per
+    distinct hierarchy, blended levels are solved together)."""
+
+    def __init__(self):
+        self.finished_at = []
+
+    def callback(self, model, where) -> None:
+        if where == gp.GRB.Callback.MULTIOBJ:
+            solved = model.cbGet(gp.GRB.Callback.MULTIOBJ_OBJCNT)
+            runtime = model.cbGet(gp.GRB.Callback.RUNTIME)
+            self.finished_at[solved - 1:] = [runtime]
+
+    def runtimes(self) -> List[float]:
+        starts = [0.0] + self.finished_at[:-1]
+        return [end - start for start, end in zip(starts, self.finished_at)]
@@ -0,0 +1,137 @@
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from typing import List, Optional
+
+import gurobipy as gp
+import numpy as np
+
+from ..low_sugar import parallel
+from .terms import LinearTerms, set_linear_objective, terms_values
+
+METHODS = ("weighted", "epsilon")
+# Weight of the secondary parts in the epsilon-constraint objective, it avoids weakly
+# dominated points
+AUGMENTATION = 1e-4
+
+
+def pareto_frontier(
+    model: gp.Model,
+    terms: List[LinearTerms],
+    n_points: int = 11,
+    method: str = "weighted",
+    processes: Optional[int] = None,
+    params: Optional[dict] = None,
+) -> np.ndarray:
+    """Approximates the Pareto frontier between the parts given as linear terms. The
+    objective of the model is replaced, its sense is kept.
+
+    First every part is optimized alone (the anchor points), their ranges normalize
+    the parts. Then the points are solved on the same model, each one warm starting
+    from its neighbor: "weighted" solves weighted sums over a simplex grid with
+    ``n_points - 1`` divisions per part and "epsilon" optimizes the first part
+    constraining the others to ``n_points`` levels between their anchor values.
+
+    :param processes: if given, the points are split in contiguous chunks solved in
+        worker processes, each one reads a copy of the model
+    :param params: gurobi parameters set in the worker processes
+    :return: non dominated part values, shape (points, parts)
+    """
+    if method not in METHODS:
+        raise ValueError(f"method should be one of {METHODS}")
+    anchors = _solve_points(model, terms, np.eye(len(terms)), "weighted")
+    ranges = np.ptp(anchors, axis=0)
+    ranges[~(ranges > 0)] = 1.0
+    if method == "weighted":
+        points = weight_grid(len(terms), n_points) / ranges
+    else:
+        points = epsilon_grid(anchors, n_points, model.ModelSense)
+    if processes:
+        values = _solve_parallel(model, terms, points, method, processes, params, ranges)
+    else:
+        values = _solve_points(model, terms, points, method, ranges)
+    return nondominated(np.vstack([anchors, values]), model.ModelSense)
+
+
+def weight_grid(part_count: int, n_points: int) -> np.ndarray:
+    """Weights over the simplex with ``n_points - 1`` divisions, consecutive rows are
+    neighbors. For two parts it is ``(1 - t, t)`` for ``n_points`` values of t."""
+    divisions = max(n_points - 1, 1)
+    grid = [
+        (divisions - sum(rest), *rest)
+        for rest in product(range(divisions + 1), repeat=part_count - 1)
+        if sum(rest) <= divisions
+    ]
+    return np.array(grid, dtype=float) / divisions
+
+
+def epsilon_grid(anchors: np.ndarray, n_points: int, sense: int) -> np.ndarray:
+    """Bounds of the secondary parts, from the loosest to the tightest"""
+    secondary = anchors[:, 1:] * sense  # minimization costs
+    levels = np.linspace(secondary.max(axis=0), secondary.min(axis=0), n_points) * sense
+    return np.array(list(product(*levels.T)))
+
+
+def nondominated(values: np.ndarray, sense: int) -> np.ndarray:
+    """Unique rows not dominated by any other row, sorted by the first part"""
+    values = values[~np.isnan(values).any(axis=1)]
+    values = np.unique(values.round(9), axis=0)
+    costs = values * sense  # minimization costs
+    keep = [
+        not np.any(np.all(costs <= row, axis=1) & np.any(costs < row, axis=1))
+        for row in costs
+    ]
+    return values[keep]
+
+
+def _solve_points(model, terms, points, method, ranges=None) -> np.ndarray:
+    values = np.full((len(points), len(terms)), np.nan)
+    constrs = []
+    if method == "epsilon":
+        weights = [1.0] + [AUGMENTATION * ranges[0] / r for r in ranges[1:]]
+        set_linear_objective(model, terms, weights)
+        sense = gp.GRB.LESS_EQUAL if model.ModelSense == gp.GRB.MINIMIZE else gp.GRB.GREATER_EQUAL
+        variables = model.getVars()
+        constrs = [
+            model.addLConstr(part_terms.expr(variables), sense, model.ModelSense * gp.GRB.INFINITY)
+            for part_terms in terms[1:]
+        ]
+    for position, point in enumerate(points):
+        if method == "epsilon":
+            rhs = [bound - part.constant for bound, part in zip(point, terms[1:])]
+            model.setAttr("RHS", constrs, rhs)
+        else:
+            set_linear_objective(model, terms, point)
+        model.optimize()
+        if model.SolCount:
+            values[position] = terms_values(model, terms)
+    if constrs:
+        model.remove(constrs)
+        model.update()
+    return values
+
+
+def _solve_parallel(model, terms, points, method, processes, params, ranges) -> np.ndarray:
+    params = {"Threads": parallel.threads_per_worker(processes), **(params or {})}
+    chunks = np.array_split(points, processes)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "model.mps")
+        model.write(path)
+        with ProcessPoolExecutor(
+            max_workers=processes, mp_context=multiprocessing.get_context(parallel.MP_CONTEXT)
+        ) as executor:
+            futures = [
+                executor.submit(_solve_chunk, path, terms, chunk, method, params, ranges)
+                for chunk in chunks
+                if len(chunk)
+            ]
+            return np.vstack([future.result() for future in futures])
+
+
+def _solve_chunk(path, terms, points, method, params, ranges) -> np.ndarray:
+    with gp.Env(params={"OutputFlag": 0}) as env, gp.read(path, env=env) as model:
+        for param, value in params.items():
+            model.setParam(param, value)
+        return _solve_points(model, terms, points, method, ranges)
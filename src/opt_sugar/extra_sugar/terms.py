@@ -0,0 +1,66 @@
+from numbers import Number
+from typing import List, NamedTuple, Optional, Sequence
+
+import gurobipy as gp
+import numpy as np
+
+
+class LinearTerms(NamedTuple):
+    """Linear expression as arrays, ``indices`` are gurobi variable indices"""
+
+    indices: np.ndarray
+    coefficients: np.ndarray
+    constant: float
+
+    def value(self, x: np.ndarray) -> float:
+        """Value given the values of all the model variables in index order"""
+        return float(self.coefficients @ x[self.indices]) + self.constant
+
+    def expr(self, variables: List[gp.Var]) -> gp.LinExpr:
+        """Expression over ``variables`` (all the model variables in index order)"""
+        expr = gp.LinExpr(self.coefficients.tolist(), [variables[i] for i in self.indices])
+        expr.addConstant(self.constant)
+        return expr
+
+
+def linear_terms(expr) -> LinearTerms:
+    if isinstance(expr, Number):
+        return LinearTerms(np.empty(0, dtype=np.int64), np.empty(0), float(expr))
+    if isinstance(expr, gp.Var):
+        return LinearTerms(np.array([expr.index]), np.ones(1), 0.0)
+    if not isinstance(expr, gp.LinExpr):
+        raise TypeError(
+            f"Only linear objective parts can be re-weighted, got {type(expr).__name__}"
+        )
+    size = expr.size()
+    indices = np.fromiter((expr.getVar(i).index for i in range(size)), dtype=np.int64, count=size)
+    coefficients = np.fromiter((expr.getCoeff(i) for i in range(size)), dtype=float, count=size)
+    return LinearTerms(indices, coefficients, expr.getConstant())
+
+
+def set_linear_objective(
+    model: gp.Model,
+    terms: List[LinearTerms],
+    weights: Sequence[float],
+    index: Optional[int] = None,
+) -> None:
+    """Sets the objective (or objective ``index`` of a multi-objective model) to the
+    weighted sum of the terms with a single bulk attribute update."""
+    coefficients = np.zeros(model.NumVars)
+    constant = 0.0
+    for part_terms, weight in zip(terms, weights):
+        np.add.at(coefficients, part_terms.indices, weight * part_terms.coefficients)
+        constant += weight * part_terms.constant
+    if index is None:
+        model.setAttr("Obj", model.getVars(), coefficients.tolist())
+        model.ObjCon = constant
+    else:
+        model.params.ObjNumber = index
+        model.setAttr("ObjN", model.getVars(), coefficients.tolist())
+        model.ObjNCon = constant
+
+
+def terms_values(model: gp.Model, terms: List[LinearTerms]) -> np.ndarray:
+    """Value of every terms in the current solution of the model"""
+    x = np.array(model.getAttr("X", model.getVars()))
+    return np.array([part_terms.value(x) for part_terms in terms])
@@ -1 +1,10 @@
 from .low_sugar import Model  # noqa: F401
+from .result import VarGroup  # noqa: F401
+from .bindings import bind  # noqa: F401
+from .registry import add_var, add_vars  # noqa: F401
+from .warm_start import WarmStartStore  # noqa: F401
+from .aio import ProgressEvent, ProgressStream  # noqa: F401
+from .cache import MemoryCache, DiskCache, TieredCache  # noqa: F401
+from .env_pool import EnvPool  # noqa: F401
+from .profiler import BuildProfiler  # noqa: F401
+from .model_store import ModelStore  # noqa: F401
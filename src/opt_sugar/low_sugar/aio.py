@@ -0,0 +1,106 @@
+import asyncio
+import functools
+import math
+import threading
+from typing import Callable, NamedTuple, Optional
+
+import gurobipy as gp
+
+from .callbacks import chain
+
+_END = object()
+
+
+class ProgressEvent(NamedTuple):
+    runtime: float
+    incumbent: float
+    bound: float
+    gap: float
+    node_count: float
+
+
+class ProgressStream:
+    """Async iterator of ProgressEvent, fed from a gurobi MIP callback while the solve
+    runs in a worker thread. An event is emitted every time the incumbent or the bound
+    change and the iteration stops when the solve finishes.
+
+    Create it inside the running event loop and pass it to ``aoptimize``::
+
+        progress = ProgressStream()
+        task = asyncio.create_task(opt_model.aoptimize(data, progress=progress))
+        async for event in progress:
+            print(event.gap)
+        result = await task
+    """
+
+    def __init__(self):
+        self._queue = asyncio.Queue()
+        self._loop = None
+        self._last = None
+
+    def attach(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+
+    def callback(self, model, where) -> None:
+        if where != gp.GRB.Callback.MIP:
+            return
+        incumbent = model.cbGet(gp.GRB.Callback.MIP_OBJBST)
+        bound = model.cbGet(gp.GRB.Callback.MIP_OBJBND)
+        if (incumbent, bound) == self._last:
+            return
+        self._last = incumbent, bound
+        event = ProgressEvent(
+            runtime=model.cbGet(gp.GRB.Callback.RUNTIME),
+            incumbent=incumbent,
+            bound=bound,
+            gap=_gap(incumbent, bound),
+            node_count=model.cbGet(gp.GRB.Callback.MIP_NODCNT),
+        )
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, event)
+
+    def close(self) -> None:
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, _END)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> ProgressEvent:
+        event = await self._queue.get()
+        if event is _END:
+            raise StopAsyncIteration
+        return event
+
+
+def _gap(incumbent: float, bound: float) -> float:
+    if abs(incumbent) >= gp.GRB.INFINITY or incumbent == 0:
+        return math.inf
+    return abs(bound - incumbent) / abs(incumbent)
+
+
+async def run_solve(solve: Callable, progress: Optional[ProgressStream] = None):
+    """Runs ``solve(solve_callback)`` in the default executor of the running loop.
+    ``solve`` should pass ``solve_callback`` to model.optimize, cancelling the awaiting
+    task then terminates the gurobi solve and waits for it to stop."""
+    loop = asyncio.get_running_loop()
+    cancelled = threading.Event()
+
+    def terminate_if_cancelled(model, _where):
+        if cancelled.is_set():
+            model.terminate()
+
+    if progress is not None:
+        progress.attach(loop)
+    solve_callback = chain(
+        terminate_if_cancelled, progress.callback if progress is not None else None
+    )
+    future = loop.run_in_executor(None, functools.partial(solve, solve_callback))
+    try:
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        cancelled.set()
+        await asyncio.wait([future])
+        future.exception()  # the interrupted solve may fail reading the solution
+        raise
+    finally:
+        if progress is not None:
+            progress.close()
@@ -0,0 +1,56 @@
+import weakref
+from typing import Callable, List
+
+import gurobipy as gp
+
+ATTRIBUTES = ("RHS", "LB", "UB", "Obj")
+
+# Bindings of the models, kept out of the gurobipy model like registry._registries
+_bindings = weakref.WeakKeyDictionary()
+
+
+class Binding:
+    """Links a gurobi attribute of some variables or constraints to the data.
+
+    :param attr: one of "RHS", "LB", "UB" or "Obj"
+    :param items: dict like (e.g. tupledict) of variables or constraints, or a list of them
+    :param values: function receiving the data and returning the attribute values, a
+        mapping with the same keys as ``items`` or a sequence aligned with it
+    """
+
+    def __init__(self, attr: str, items, values: Callable):
+        if attr not in ATTRIBUTES:
+            raise ValueError(f"attr should be one of {ATTRIBUTES}")
+        self.attr = attr
+        self.values = values
+        if hasattr(items, "keys"):
+            self._keys = list(items.keys())
+            self._objects = list(items.values())
+        else:
+            self._keys = None
+            self._objects = list(items)
+
+    def apply(self, model: gp.Model, data) -> None:
+        values = self.values(data)
+        if self._keys is not None and hasattr(values, "keys"):
+            values = [values[key] for key in self._keys]
+        model.setAttr(self.attr, self._objects, list(values))
+
+
+def bind(model: gp.Model, attr: str, items, values: Callable) -> Binding:
+    """Declares that ``attr`` of ``items`` is computed from the data by ``values``, so
+    a kept model can be updated in place when it is optimized with new data instead
+    of being built again. Check Binding for the arguments."""
+    binding = Binding(attr, items, values)
+    get_bindings(model).append(binding)
+    return binding
+
+
+def get_bindings(model: gp.Model) -> List[Binding]:
+    return _bindings.setdefault(model, [])
+
+
+def update(model: gp.Model, data) -> None:
+    """Applies every binding of the model to the new data."""
+    for binding in get_bindings(model):
+        binding.apply(model, data)
@@ -0,0 +1,223 @@
+import os
+import pickle
+import tempfile
+import threading
+import time
+from abc import abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Optional
+
+from .fingerprint import callable_fingerprint, fingerprint
+
+
+def cache_key(data_key, builder, params: Optional[dict] = None, **extra) -> str:
+    """Key of a solve given a key of the input data (e.g. its fingerprint), the builder
+    (function or ModelBuilder subclass) and the gurobi parameters. The builder and
+    the callables among the extra values (e.g. callbacks) are identified by their
+    code and closure, see fingerprint.callable_fingerprint."""
+    extra = {
+        name: callable_fingerprint(value) if callable(value) else value
+        for name, value in extra.items()
+    }
+    return fingerprint((data_key, callable_fingerprint(builder), params or {}, extra))
+
+
+class ResultCache:
+    """Base class of the solve result caches, ``get`` returns None on misses.
+    Hit, miss and eviction counters are available through ``stats``."""
+
+    def __init__(self, max_age: Optional[float] = None):
+        """:param max_age: seconds after which entries are considered stale"""
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            value = self._get(key)
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return value
+
+    def put(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._put(key, value)
+
+    def stats(self) -> dict:
+        requests = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / requests if requests else None,
+        }
+
+    def _expired(self, created: float) -> bool:
+        return self.max_age is not None and time.time() - created > self.max_age
+
+    @abstractmethod
+    def _get(self, key: str) -> Optional[Any]:
+        raise NotImplementedError(f"{type(self).__name__} should implement _get!")
+
+    @abstractmethod
+    def _put(self, key: str, value: Any) -> None:
+        raise NotImplementedError(f"{type(self).__name__} should implement _put!")
+
+
+class MemoryCache(ResultCache):
+    """Least recently used in-memory cache. Values are stored pickled, like in
+    DiskCache, so every hit returns a new copy that callers can modify and the size
+    of the entries is known. Values that can not be pickled are not cached.
+
+    :param max_items: entries kept before evicting the least recently used one
+    :param max_bytes: size of the pickled entries before evicting the least recently
+        used ones
+    :param max_age: seconds after which entries are considered stale
+    """
+
+    def __init__(
+        self,
+        max_items: int = 128,
+        max_bytes: Optional[int] = None,
+        max_age: Optional[float] = None,
+    ):
+        super().__init__(max_age=max_age)
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        created, payload = entry
+        if self._expired(created):
+            self._pop(key)
+            self.evictions += 1
+            return None
+        self._entries.move_to_end(key)
+        return pickle.loads(payload)
+
+    def _put(self, key, value):
+        try:
+            payload = pickle.dumps(value)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            return
+        if key in self._entries:
+            self._pop(key)
+        self._entries[key] = (time.time(), payload)
+        self.size += len(payload)
+        while self._entries and (
+            len(self._entries) > self.max_items
+            or (self.max_bytes is not None and self.size > self.max_bytes)
+        ):
+            self._pop(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _pop(self, key):
+        _, payload = self._entries.pop(key)
+        self.size -= len(payload)
+
+
+class DiskCache(ResultCache):
+    """On-disk cache storing one pickle file per entry, so it is shared between
+    processes and survives restarts. Files are evicted by age and, least recently used
+    first, when the directory grows over ``max_bytes``.
+
+    :param path: cache directory, created if needed
+    :param max_bytes: size of the directory before evicting entries
+    :param max_age: seconds after which entries are considered stale
+    """
+
+    suffix = ".pkl"
+
+    def __init__(self, path, max_bytes: Optional[int] = None, max_age: Optional[float] = None):
+        super().__init__(max_age=max_age)
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+
+    def _file(self, key: str) -> Path:
+        return self.path / f"{key}{self.suffix}"
+
+    def _get(self, key):
+        file = self._file(key)
+        try:
+            if self._expired(file.stat().st_mtime):
+                file.unlink()
+                self.evictions += 1
+                return None
+            with open(file, "rb") as f:
+                value = pickle.load(f)
+            os.utime(file)  # mtime keeps track of the last use
+            return value
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return None
+
+    def _put(self, key, value):
+        with tempfile.NamedTemporaryFile(dir=self.path, suffix=".tmp", delete=False) as f:
+            pickle.dump(value, f)
+        os.replace(f.name, self._file(key))
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        for file in self.path.glob(f"*{self.suffix}"):
+            try:
+                entries.append((file.stat(), file))
+            except FileNotFoundError:
+                continue
+        entries.sort(key=lambda entry: entry[0].st_mtime)
+        size = sum(stat.st_size for stat, _ in entries)
+        for stat, file in entries:
+            expired = self._expired(stat.st_mtime)
+            if not expired and (self.max_bytes is None or size <= self.max_bytes):
+                continue
+            try:
+                file.unlink()
+            except FileNotFoundError:
+                continue
+            size -= stat.st_size
+            self.evictions += 1
+
+
+class TieredCache(ResultCache):
+    """Memory cache in front of a disk cache, disk hits are promoted to memory."""
+
+    def __init__(self, memory: MemoryCache, disk: DiskCache):
+        super().__init__()
+        self.memory = memory
+        self.disk = disk
+
+    def _get(self, key):
+        value = self.memory.get(key)
+        if value is None:
+            value = self.disk.get(key)
+            if value is not None:
+                self.memory.put(key, value)
+        return value
+
+    def _put(self, key, value):
+        self.memory.put(key, value)
+        self.disk.put(key, value)
+
+    def stats(self) -> dict:
+        return {**super().stats(), "memory": self.memory.stats(), "disk": self.disk.stats()}
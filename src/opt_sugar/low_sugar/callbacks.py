@@ -0,0 +1,15 @@
+from typing import Callable, Optional
+
+
+def chain(*callbacks: Optional[Callable]) -> Optional[Callable]:
+    """Combines gurobi callbacks ``(model, where)`` into one, since model.optimize
+    accepts a single callback. None entries are ignored."""
+    callbacks = [callback for callback in callbacks if callback is not None]
+    if len(callbacks) <= 1:
+        return callbacks[0] if callbacks else None
+
+    def chained(model, where):
+        for callback in callbacks:
+            callback(model, where)
+
+    return chained
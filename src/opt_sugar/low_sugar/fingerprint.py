@@ -0,0 +1,146 @@
+import functools
+import hashlib
+import inspect
+import pickle
+import struct
+
+import numpy as np
+
+
+def fingerprint(obj) -> str:
+    """Stable hash of nested data (dicts, sets, sequences, scalars, NumPy arrays and
+    pandas objects). It does not depend on dict or set ordering, so it can be used to
+    identify the same data across processes and restarts. Other objects are pickled,
+    TypeError is raised if they can not be (e.g. locks or lambdas)."""
+    hasher = hashlib.blake2b(digest_size=16)
+    _update(hasher, obj)
+    return hasher.hexdigest()
+
+
+def callable_name(function) -> str:
+    """Importable name of a function or class plus its ``version`` attribute if any"""
+    name = f"{getattr(function, '__module__', '')}.{getattr(function, '__qualname__', '')}"
+    version = getattr(function, "version", None)
+    return name if version is None else f"{name}:{version}"
+
+
+def callable_fingerprint(function) -> str:
+    """Stable hash of a function or class: its name, ``version`` attribute, code,
+    default arguments and closure (methods for classes). Closures made by the same
+    factory or lambdas of the same module get different hashes if their code or
+    captured values differ. Captured values other than callables are hashed with
+    fingerprint, so they should be data."""
+    hasher = hashlib.blake2b(digest_size=16)
+    _update_callable(hasher, function, set())
+    return hasher.hexdigest()
+
+
+def _update_callable(hasher, function, seen: set) -> None:
+    if id(function) in seen:  # recursive closures
+        return
+    seen.add(id(function))
+    _update_scalar(hasher, callable_name(function))
+    if isinstance(function, functools.partial):
+        _update_callable(hasher, function.func, seen)
+        _update_captured(hasher, (function.args, function.keywords), seen)
+    elif isinstance(function, type):
+        for cls in function.__mro__[:-1]:
+            for name, member in sorted(vars(cls).items()):
+                member = getattr(member, "__func__", member)  # static and class methods
+                if inspect.isfunction(member):
+                    _update_scalar(hasher, name)
+                    _update_callable(hasher, member, seen)
+    elif inspect.isfunction(function) or inspect.ismethod(function):
+        function = getattr(function, "__func__", function)
+        _update_code(hasher, function.__code__)
+        _update_captured(hasher, function.__defaults__, seen)
+        _update_captured(hasher, function.__kwdefaults__, seen)
+        for cell in function.__closure__ or ():
+            try:
+                _update_captured(hasher, cell.cell_contents, seen)
+            except ValueError:  # cell not assigned yet
+                hasher.update(b"e")
+    # other callables (builtins, instances) are identified by their name
+
+
+def _update_code(hasher, code) -> None:
+    hasher.update(b"c" + code.co_code)
+    _update(hasher, code.co_names)
+    for const in code.co_consts:
+        if inspect.iscode(const):  # nested functions, lambdas and comprehensions
+            _update_code(hasher, const)
+        else:
+            _update(hasher, const)
+
+
+def _update_captured(hasher, value, seen: set) -> None:
+    _update(hasher, _captured(value, seen))
+
+
+def _captured(value, seen: set):
+    """Value with the callables in it (also within lists, tuples and dicts) replaced by
+    their hash"""
+    if callable(value):
+        hasher = hashlib.blake2b(digest_size=16)
+        _update_callable(hasher, value, seen)
+        return ("callable", hasher.hexdigest())
+    if isinstance(value, (list, tuple)):
+        return [_captured(item, seen) for item in value]
+    if isinstance(value, dict):
+        return {key: _captured(item, seen) for key, item in value.items()}
+    return value
+
+
+def _update(hasher, obj) -> None:
+    if obj is None or isinstance(obj, (bool, int, float, complex, str, bytes)):
+        _update_scalar(hasher, obj)
+    elif isinstance(obj, dict):
+        hasher.update(b"d")
+        _update_unordered(hasher, obj.items())
+    elif isinstance(obj, (set, frozenset)):
+        hasher.update(b"s")
+        _update_unordered(hasher, obj)
+    elif isinstance(obj, (list, tuple, range)):
+        hasher.update(b"l" + struct.pack("<q", len(obj)))
+        for item in obj:
+            _update(hasher, item)
+    elif isinstance(obj, np.ndarray):
+        _update_array(hasher, obj)
+    elif hasattr(obj, "to_numpy") and hasattr(obj, "index"):  # pandas objects
+        hasher.update(b"p")
+        _update(hasher, list(getattr(obj, "columns", [])))
+        _update_array(hasher, obj.index.to_numpy())
+        _update_array(hasher, obj.to_numpy())
+    elif isinstance(obj, np.generic):
+        _update_scalar(hasher, obj.item())
+    else:
+        hasher.update(b"o")
+        try:
+            hasher.update(pickle.dumps(obj, protocol=4))
+        except (pickle.PicklingError, TypeError, AttributeError) as error:
+            raise TypeError(f"{type(obj).__name__} can not be fingerprinted") from error
+
+
+def _update_scalar(hasher, obj) -> None:
+    hasher.update(type(obj).__name__.encode())
+    hasher.update(repr(obj).encode())
+    hasher.update(b"\0")
+
+
+def _update_unordered(hasher, items) -> None:
+    try:
+        items = sorted(items)
+    except TypeError:
+        # mixed key types, the digests of the items are sorted instead
+        items = sorted(fingerprint(item) for item in items)
+    hasher.update(struct.pack("<q", len(items)))
+    for item in items:
+        _update(hasher, item)
+
+
+def _update_array(hasher, array: np.ndarray) -> None:
+    hasher.update(b"a" + str(array.dtype).encode() + str(array.shape).encode())
+    if array.dtype == object:
+        _update(hasher, array.tolist())
+    else:
+        hasher.update(np.ascontiguousarray(array).tobytes())
@@ -0,0 +1,86 @@
+from array import array
+from typing import Dict, List
+
+import gurobipy as gp
+import numpy as np
+
+# Values of the new_solution field
+NO_SOLUTION, HEURISTIC_SOLUTION, NODE_SOLUTION = 0, 1, 2
+_NEW_SOLUTION_FLAGS = {"H": HEURISTIC_SOLUTION, "*": NODE_SOLUTION}
+
+
+class NodeLogCapture:
+    """Gurobi MESSAGE callback that parses the MIP node log while the solve runs, no
+    log file is written or read. Lines are parsed as they arrive and stored in compact
+    arrays, see ``progress``. The log is only emitted when OutputFlag is 1 (LogToConsole
+    can be 0).
+
+    :param keep_lines: also keeps every log line in ``lines``
+    """
+
+    float_fields = ("time", "explored", "unexplored", "incumbent", "bound", "gap")
+
+    def __init__(self, keep_lines: bool = False):
+        self.keep_lines = keep_lines
+        self.lines: List[str] = []
+        self._columns = {field: array("d") for field in self.float_fields}
+        self._new_solution = array("b")
+        self._in_node_log = False
+        self._pending = ""
+
+    def callback(self, model, where) -> None:
+        if where == gp.GRB.Callback.MESSAGE:
+            self.feed(model.cbGet(gp.GRB.Callback.MSG_STRING))
+
+    def feed(self, message: str) -> None:
+        lines = (self._pending + message).split("\n")
+        self._pending = lines.pop()
+        for line in lines:
+            if self.keep_lines:
+                self.lines.append(line)
+            self._parse(line)
+
+    def _parse(self, line: str) -> None:
+        if "Expl Unexpl" in line:
+            self._in_node_log = True
+            return
+        if not self._in_node_log:
+            return
+        if line.startswith(("Explored", "Cutting planes")):
+            self._in_node_log = False
+            return
+        tokens = line.split()
+        new_solution = NO_SOLUTION
+        if tokens and tokens[0] in _NEW_SOLUTION_FLAGS:
+            new_solution = _NEW_SOLUTION_FLAGS[tokens.pop(0)]
+        if len(tokens) < 7 or not tokens[0].isdigit() or not tokens[-1].endswith("s"):
+            return
+        try:
+            row = (
+                float(tokens[-1][:-1]),
+                float(tokens[0]),
+                float(tokens[1]),
+                _to_float(tokens[-5]),
+                _to_float(tokens[-4]),
+                _to_float(tokens[-3].rstrip("%")) / 100,
+            )
+        except ValueError:
+            return
+        for field, value in zip(self.float_fields, row):
+            self._columns[field].append(value)
+        self._new_solution.append(new_solution)
+
+    def progress(self) -> Dict[str, np.ndarray]:
+        """Node log as ``{field: array}`` with the fields time, explored, unexplored,
+        incumbent, bound, gap (as a fraction, NaN when not reported) and new_solution
+        (0: none, 1: heuristic "H", 2: found at a node "*")."""
+        progress = {
+            field: np.frombuffer(column, dtype=float).copy()
+            for field, column in self._columns.items()
+        }
+        progress["new_solution"] = np.frombuffer(self._new_solution, dtype=np.int8).copy()
+        return progress
+
+
+def _to_float(token: str) -> float:
+    return float("nan") if token == "-" else float(token)
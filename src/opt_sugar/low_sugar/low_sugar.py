@@ -1,16 +1,131 @@
-import re
-from collections import defaultdict
-from typing import Callable
+import functools
+from typing import Callable, Iterable, Optional
+
+import gurobipy as gp
+import numpy as np
+
+from . import aio, bindings, parallel, race, sweep
+from .cache import ResultCache, cache_key
+from .env_pool import EnvPool, build_with_env, release_model
+from .fingerprint import fingerprint
+from .model_store import ModelStore
+from .pool import SolutionPool
+from .profiler import make_profiler, span
+from .registry import get_var_index
+from .result import VarIndex, parse_var_name
+from .sensitivity import get_constr_index, read_sensitivity
+from .warm_start import WarmStartStore
+
+RESULT_FORMATS = ("dict", "columnar")
 
 
 class Model:
-    def __init__(self, build):
+    def __init__(
+        self,
+        build,
+        result_format: str = "dict",
+        keep_model: bool = False,
+        warm_start: Optional[WarmStartStore] = None,
+        cache: Optional[ResultCache] = None,
+        env_pool: Optional[EnvPool] = None,
+        profile=False,
+        model_store: Optional[ModelStore] = None,
+        pool_size: Optional[int] = None,
+        sensitivity: bool = False,
+    ):
+        """
+        :param build: function receiving the data and returning a gurobipy model,
+            variables created with low_sugar.add_vars are grouped without names
+        :param result_format: "dict" returns the variables as ``{group: {index: value}}``,
+            "columnar" returns them as ``{group: VarGroup}`` backed by NumPy arrays
+        :param keep_model: keeps the built model alive between optimize calls, if the
+            build function declared bindings (see low_sugar.bind) the next calls only
+            update the bound attributes and re-optimize, warm starting from the
+            previous solve
+        :param warm_start: store used to set MIP starts from the previous solution of
+            a model with the same name, runtime and work are recorded in its history
+        :param cache: result cache (e.g. low_sugar.MemoryCache), optimize returns the
+            cached result when the data, build function and params were already solved
+        :param env_pool: pool of gurobi environments, the build function receives a
+            leased one as ``build(data, env=env)`` and should pass it to gp.Model
+        :param profile: records wall time, memory and model size of the build, solve
+            and extraction, the results get a "profile" entry (a BuildProfiler), cached
+            results do not. "time" does not trace memory, so the timings are not
+            slowed down
+        :param model_store: store of built models keyed by the data fingerprint and the
+            build function (and its ``version`` attribute), identical data is loaded
+            from it instead of being built again
+        :param pool_size: the results get a "pool" entry (a low_sugar.pool.SolutionPool)
+            with up to pool_size solutions of the solution pool, best first, grouped
+            like "vars". Gurobi keeps up to PoolSolutions solutions, see PoolSearchMode
+        :param sensitivity: the results of continuous models get a "sensitivity" entry
+            with the duals, reduced costs, slacks and sensitivity ranges grouped by
+            variable group and constraint family (see sensitivity.read_sensitivity),
+            it is None for MIP models and when gurobi did not compute them (e.g.
+            barrier solves without crossover)
+        """
+        if result_format not in RESULT_FORMATS:
+            raise ValueError(f"result_format should be one of {RESULT_FORMATS}")
         self.data = None
+        self.result_format = result_format
+        self.keep_model = keep_model
+        self.warm_start = warm_start
+        self.cache = cache
+        self.env_pool = env_pool
+        self.profile = profile
+        self.model_store = model_store
+        self.pool_size = pool_size
+        self.sensitivity = sensitivity
+        self._var_index = None
+        self._constr_index = None
+        self._build = build
+        self._model = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_model"], state["env_pool"] = None, None
+        return state
+
+    def build(self, env=None):
+        if env is None:
+            return self._build(self.data)
+        return self._build(self.data, env=env)
 
-        def build_():
-            return build(self.data)
+    def _build_or_load(self, env=None):
+        if self.model_store is None:
+            return self.build(env)
+        key = self._cache_key(self.data)
+        if key is None:
+            return self.build(env)
+        loaded = self.model_store.load(key, env)
+        if loaded is not None:
+            return loaded[0]
+        model = self.build(env)
+        self.model_store.save(key, model)
+        return model
 
-        self.build = build_
+    def _cache_key(self, data, params=None, **extra) -> Optional[str]:
+        """Key of the solve in the cache or model store, None if the data can not be
+        fingerprinted (e.g. it holds locks), such solves are neither cached nor stored"""
+        try:
+            return cache_key(fingerprint(data), self._build, params, **extra)
+        except TypeError:
+            return None
+
+    def reset(self):
+        """Drops the kept model, the next optimize call builds it again"""
+        model, self._model = self._model, None
+        release_model(model)
+
+    def _get_model(self):
+        if self._model is not None and bindings.get_bindings(self._model):
+            bindings.update(self._model, self.data)
+            return self._model
+        self.reset()
+        model = build_with_env(self.env_pool, self._build_or_load)
+        if self.keep_model:
+            self._model = model
+        return model
 
     def fit(self):
         """Defining this to avoid warning from mlflow"""
@@ -20,39 +135,195 @@ class Model:
         """Defining this to avoid warning from mlflow"""
         return self.optimize(data)
 
-    def optimize(self, data, callback: Callable = lambda model: dict()):
+    def optimize(
+        self,
+        data,
+        callback: Callable = lambda model: dict(),
+        params: Optional[dict] = None,
+        solve_callback: Optional[Callable] = None,
+    ):
         """
         :param data:
         :param callback: Check (https://www.gurobi.com/documentation/9.5/refman/attributes.html)
+        :param params: gurobi parameters set on the built model before optimizing
+        :param solve_callback: gurobi callback ``(model, where)`` passed to model.optimize
         :return: results
         """
         self.data = data
-        model = self.build()
-        model.optimize()
-        result = self._get_result(model)
-        callback_result = callback(model)
+        key = None
+        if self.cache is not None:
+            key = self._cache_key(
+                data,
+                params,
+                result_format=self.result_format,
+                pool_size=self.pool_size,
+                sensitivity=self.sensitivity,
+                callback=callback,
+                solve_callback=solve_callback,
+            )
+        if key is not None:
+            result = self.cache.get(key)
+            if result is not None:
+                return result
+        profiler = make_profiler(self.profile)
+        with span(profiler, "build") as context:
+            model = context["model"] = self._get_model()
+            model.update()
+        try:
+            for param, value in (params or {}).items():
+                model.setParam(param, value)
+            warm_started = self.warm_start.apply(model) if self.warm_start else False
+            with span(profiler, "optimize", model):
+                model.optimize(solve_callback)
+            optimal = model.Status == gp.GRB.OPTIMAL
+            if self.warm_start:
+                self.warm_start.record(model, warm_started)
+            with span(profiler, "extract", model):
+                result = self._get_result(model)
+            callback_result = callback(model)
+        finally:
+            if model is not self._model:
+                release_model(model)
         if callback_result:
             result = {**result, "callback_result": callback_result}
+        # Results of solves stopped early (e.g. by a TimeLimit) are not reused. The
+        # profile belongs to this run, cache hits have none
+        if key is not None and optimal:
+            self.cache.put(key, result)
+        if profiler is not None:
+            result["profile"] = profiler
         return result
 
+    async def aoptimize(
+        self,
+        data,
+        callback: Callable = lambda model: dict(),
+        params: Optional[dict] = None,
+        progress: Optional[aio.ProgressStream] = None,
+    ):
+        """Same as optimize but runs the build and solve in the default executor of the
+        running event loop. Cancelling the task terminates the gurobi solve. Concurrent
+        solves should use separate Model instances, sharing an env_pool between them so
+        they do not share gurobi environments.
+
+        :param progress: aio.ProgressStream receiving incumbent, bound and gap events
+        :return: results
+        """
+        solve = functools.partial(self.optimize, data, callback, params)
+        return await aio.run_solve(solve, progress)
+
+    def optimize_many(
+        self,
+        datasets: Iterable,
+        callback: Optional[Callable] = None,
+        params: Optional[dict] = None,
+        max_workers: Optional[int] = None,
+        ordered: bool = True,
+    ):
+        """Optimizes every data set in a pool of worker processes, the cores are split
+        between workers through the gurobi Threads parameter. Worker processes are
+        spawned, see low_sugar.parallel.
+
+        :param datasets: data sets to optimize
+        :param callback: same as in optimize
+        :param params: same as in optimize, Threads overrides the automatic split
+        :param max_workers: worker processes, by default the number of cores
+        :param ordered: if False results are yielded as ``(position, result)`` tuples
+            as soon as they complete
+        :return: results
+        """
+        kwargs = {"params": params}
+        if callback is not None:
+            kwargs["callback"] = callback
+        return parallel.solve_many(
+            self, "optimize", datasets, kwargs, max_workers=max_workers, ordered=ordered
+        )
+
+    def sweep_params(
+        self,
+        datasets: Iterable,
+        configs: list,
+        replications: int = 1,
+        threads: int = 1,
+        cores: Optional[int] = None,
+    ):
+        """Solves every data set with every gurobi parameter configuration, building
+        each instance once. See sweep.sweep
+
+        :param configs: parameter sets, see sweep.parameter_grid and
+            sweep.random_configs
+        :return: table as ``{column: array}`` with the runtime, work, gap and
+            objective of every run
+        """
+        return sweep.sweep(self._build, datasets, configs, replications, threads, cores)
+
+    def race(
+        self,
+        data,
+        configs: list,
+        target_gap: Optional[float] = None,
+        cores: Optional[int] = None,
+        share_incumbents: bool = True,
+    ):
+        """Builds the model once and solves copies of it with every gurobi parameter
+        configuration in parallel processes, the first one proving optimality (or
+        reaching target_gap) wins and the others are terminated. See race.race
+
+        :param configs: parameter sets, e.g. ``[{"MIPFocus": 1}, {"Method": 2}]``
+        :return: results, "race" has the position and params of the winning config,
+            its status and runtime
+        """
+        self.data = data
+        model = self._get_model()
+        try:
+            model.update()
+            var_index = self._get_var_index(model)
+            outcome = race.race(model, configs, target_gap, cores, share_incumbents)
+        finally:
+            if model is not self._model:
+                release_model(model)
+        values = outcome.pop("values")
+        return {
+            "vars": None if values is None else self._group(var_index, values),
+            "objective_value": outcome["objective_value"],
+            "race": outcome,
+        }
+
+    def _get_var_index(self, model) -> VarIndex:
+        var_index = get_var_index(model)
+        if var_index is not None:
+            return var_index
+        names = model.getAttr("VarName", model.getVars())
+        if self._var_index is None or not self._var_index.matches(names):
+            self._var_index = VarIndex(names)
+        return self._var_index
+
+    def _group(self, var_index: VarIndex, values):
+        if self.result_format == "columnar":
+            return var_index.columnar(np.asarray(values, dtype=float))
+        return var_index.group(values.tolist() if isinstance(values, np.ndarray) else values)
+
     def _get_result(self, model):
-        vars = defaultdict(dict)
-        for v in model.getVars():
-            try:
-                main_name, index = self.parse_var_name(v.var_name)
-                vars[main_name] = {**vars[main_name], index: v.x}
-            except TypeError:
-                vars[v.var_name] = v.x
+        var_index = self._get_var_index(model)
+        values = model.getAttr("X", model.getVars())
         result = {
-            "vars": dict(vars),
+            "vars": self._group(var_index, values),
             "objective_value": model.getObjective().getValue(),
         }
+        if self.pool_size:
+            result["pool"] = SolutionPool.from_model(
+                model, self.pool_size, var_index=var_index, result_format=self.result_format
+            )
+        if self.sensitivity and model.IsMIP:
+            result["sensitivity"] = None  # duals and ranges only exist for continuous models
+        elif self.sensitivity:
+            self._constr_index = get_constr_index(model, self._constr_index)
+            result["sensitivity"] = read_sensitivity(model, var_index, self._constr_index)
         return result
 
     @staticmethod
     def parse_var_name(var_name):
-        m = re.match(r"(?P<group_name>\w+)\[(?P<index>[\w|\,]+)\]", var_name)
-        group_name = m["group_name"]
-        index = m["index"]
-        index = tuple(int(ind) if ind.isdigit() else ind for ind in index.split(","))
-        return group_name, index
+        parsed = parse_var_name(var_name)
+        if parsed is None:
+            raise TypeError(f"{var_name} is not an indexed variable name")
+        return parsed
@@ -0,0 +1,95 @@
+import os
+import pickle
+import threading
+from pathlib import Path
+from typing import Optional, Tuple
+
+import gurobipy as gp
+
+from .registry import get_registry, set_registry
+
+
+class ModelStore:
+    """Directory of built models, written with ``model.write`` and loaded with
+    ``gp.read`` so solving the same instance again (e.g. with other parameters) skips
+    the Python build. Entries are keyed like the result caches, e.g.
+    ``cache_key(fingerprint(data), build)`` so a change of the builder code, closure
+    or ``version`` invalidates them.
+
+    Next to every model file a parameter file keeps the parameters set on the model
+    and a pickle keeps the variable registry (see low_sugar.registry) and the metadata
+    given to ``save``. Bindings are not stored, so
+    models loaded from the store are always rebuilt or reloaded for new data.
+
+    :param path: store directory, created if needed
+    :param file_format: extension of the model files, any format gurobi can read and
+        write, e.g. "mps.gz" (compressed, exact coefficients), "mps" or "lp.bz2"
+    """
+
+    def __init__(self, path, file_format: str = "mps.gz"):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.file_format = file_format.lstrip(".")
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _files(self, key: str) -> Tuple[Path, Path, Path]:
+        return (
+            self.path / f"{key}.{self.file_format}",
+            self.path / f"{key}.prm",
+            self.path / f"{key}.pkl",
+        )
+
+    def load(self, key: str, env: Optional[gp.Env] = None) -> Optional[Tuple[gp.Model, dict]]:
+        """The stored model and its metadata, None if the key is not stored"""
+        model_file, params_file, metadata_file = self._files(key)
+        model = None
+        try:
+            with open(metadata_file, "rb") as f:
+                metadata = pickle.load(f)
+            model = gp.read(str(model_file), env=env)
+            model.read(str(params_file))
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError, gp.GurobiError):
+            if model is not None:
+                model.dispose()
+            with self._lock:
+                self.misses += 1
+            return None
+        var_registry = metadata.pop("registry")
+        if var_registry is not None:
+            set_registry(model, var_registry)
+        with self._lock:
+            self.hits += 1
+        return model, metadata
+
+    def save(self, key: str, model: gp.Model, **metadata) -> None:
+        """Writes the model, its variable registry and the metadata. The metadata file
+        is written last, so concurrent readers never load a partial model."""
+        model_file, params_file, metadata_file = self._files(key)
+        model.update()
+        temporary = self.path / f"{key}.{os.getpid()}.{threading.get_ident()}.tmp"
+        for file in (model_file, params_file):
+            suffix = file.name[len(key) :]
+            model.write(f"{temporary}{suffix}")
+            os.replace(f"{temporary}{suffix}", file)
+        with open(temporary, "wb") as f:
+            pickle.dump({"registry": get_registry(model), **metadata}, f)
+        os.replace(temporary, metadata_file)
+
+    def stats(self) -> dict:
+        requests = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / requests if requests else None,
+        }
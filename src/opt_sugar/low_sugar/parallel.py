@@ -0,0 +1,82 @@
+"""Process pools solving models in parallel. Gurobi environments are not fork safe,
+so worker processes are always spawned: they import the ``__main__`` module again,
+so scripts starting them should be guarded by ``if __name__ == "__main__":``."""
+import multiprocessing
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Iterable, Iterator, Optional, Tuple
+
+try:
+    import cloudpickle
+except ImportError:  # pragma: no cover
+    cloudpickle = None
+
+MP_CONTEXT = "spawn"
+
+_worker_model = None
+
+
+def dumps(obj) -> bytes:
+    """Pickles ``obj`` using cloudpickle when available so builders defined as
+    closures or in ``__main__`` (e.g. notebooks) can be sent to worker processes."""
+    return (cloudpickle or pickle).dumps(obj)
+
+
+def threads_per_worker(max_workers: int, cpu_count: Optional[int] = None) -> int:
+    """Splits the available cores between the workers so Gurobi ``Threads`` do not
+    oversubscribe the host."""
+    cpu_count = cpu_count or os.cpu_count() or 1
+    return max(1, cpu_count // max_workers)
+
+
+def solve_many(
+    model,
+    method: str,
+    datasets: Iterable,
+    kwargs: dict,
+    max_workers: Optional[int] = None,
+    ordered: bool = True,
+):
+    """Calls ``getattr(model, method)(data, **kwargs)`` for every data set in a pool of
+    worker processes. Gurobi ``Threads`` is split between the workers unless it is
+    given in ``kwargs["params"]``.
+
+    :return: list of results in input order if ordered, otherwise an iterator of
+        ``(position, result)`` tuples as the solves complete
+    """
+    datasets = list(datasets)
+    max_workers = min(max_workers or os.cpu_count() or 1, max(len(datasets), 1))
+    params = {"Threads": threads_per_worker(max_workers), **(kwargs.get("params") or {})}
+    kwargs = {**kwargs, "params": params}
+    results = _solve_many(model, method, datasets, kwargs, max_workers)
+    if ordered:
+        ordered_results = [None] * len(datasets)
+        for position, result in results:
+            ordered_results[position] = result
+        return ordered_results
+    return results
+
+
+def _solve_many(model, method, datasets, kwargs, max_workers) -> Iterator[Tuple[int, object]]:
+    with ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context(MP_CONTEXT),
+        initializer=_load_model,
+        initargs=(dumps(model),),
+    ) as executor:
+        futures = {
+            executor.submit(_solve, method, data, kwargs): position
+            for position, data in enumerate(datasets)
+        }
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+
+def _load_model(payload: bytes) -> None:
+    global _worker_model  # pylint: disable=global-statement
+    _worker_model = pickle.loads(payload)
+
+
+def _solve(method: str, data, kwargs: dict):
+    return getattr(_worker_model, method)(data, **kwargs)
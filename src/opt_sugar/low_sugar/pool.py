@@ -0,0 +1,79 @@
+from typing import List, Optional, Tuple
+
+import gurobipy as gp
+import numpy as np
+
+from .result import VarIndex
+
+
+def read_pool(
+    model: gp.Model, max_solutions: Optional[int] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Values and objective values of the solutions in the pool of a solved model, the
+    best solution first. Every solution is read with a single attribute query over all
+    the variables.
+
+    :param max_solutions: reads only the best ones, None reads all SolCount solutions
+    :return: ``(values, objective_values)`` with shapes (solutions, NumVars) and
+        (solutions,)
+    """
+    count = model.SolCount if max_solutions is None else min(model.SolCount, max_solutions)
+    variables = model.getVars()
+    values = np.empty((count, model.NumVars))
+    objective_values = np.empty(count)
+    solution_number = model.Params.SolutionNumber
+    try:
+        for solution in range(count):
+            model.Params.SolutionNumber = solution
+            values[solution] = model.getAttr("Xn", variables)
+            objective_values[solution] = model.PoolObjVal
+    finally:
+        model.Params.SolutionNumber = solution_number
+    return values, objective_values
+
+
+class SolutionPool:
+    """Alternative solutions of a solve, ``values[i]`` are the variable values of the
+    i-th best solution and ``objective_values[i]`` its objective value. ``pool[i]``
+    groups the values of a solution like the incumbent is grouped in the results.
+
+    :param var_index: group structure of the variables, with None the solutions are
+        mapped as ``{var_name: value}`` using ``names``
+    :param result_format: "dict" or "columnar", see VarIndex.group and VarIndex.columnar
+    """
+
+    def __init__(
+        self,
+        values: np.ndarray,
+        objective_values: np.ndarray,
+        var_index: Optional[VarIndex] = None,
+        names: Optional[List[str]] = None,
+        result_format: str = "dict",
+    ):
+        self.values = values
+        self.objective_values = objective_values
+        self.var_index = var_index
+        self.names = names
+        self.result_format = result_format
+
+    @classmethod
+    def from_model(cls, model: gp.Model, max_solutions: Optional[int] = None, **kwargs):
+        """Pool of a solved model, see read_pool"""
+        return cls(*read_pool(model, max_solutions), **kwargs)
+
+    def __len__(self):
+        return len(self.objective_values)
+
+    def __getitem__(self, solution: int) -> dict:
+        values = self.values[solution]
+        if self.var_index is None:
+            return dict(zip(self.names, values.tolist()))
+        if self.result_format == "columnar":
+            return self.var_index.columnar(values)
+        return self.var_index.group(values.tolist())
+
+    def __iter__(self):
+        return (self[solution] for solution in range(len(self)))
+
+    def __repr__(self):
+        return f"SolutionPool(solutions={len(self)}, vars={self.values.shape[1]})"
@@ -0,0 +1,126 @@
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from typing import Dict, List, NamedTuple, Optional
+
+import gurobipy as gp
+
+
+class Span(NamedTuple):
+    """A profiled phase, start is relative to the creation of the profiler. Memory is
+    the Python allocation peak over the phase (tracemalloc, None on Python < 3.9 if
+    tracing was already running) and the gurobi memory (MemUsed, in GB) at its end,
+    model sizes are read at its end."""
+
+    name: str
+    start: float
+    duration: float
+    python_peak: Optional[int]
+    gurobi_memory: Optional[float]
+    num_vars: Optional[int]
+    num_constrs: Optional[int]
+    num_nzs: Optional[int]
+
+
+class BuildProfiler:
+    """Records wall time, memory and model size of the build phases (see
+    ModelBuilder.build), the solve and the result extraction.
+
+    :param trace_memory: traces Python allocations with tracemalloc, it makes the
+        profiled code noticeably slower
+    """
+
+    def __init__(self, trace_memory: bool = True):
+        self.trace_memory = trace_memory
+        self.spans: List[Span] = []
+        self._origin = time.perf_counter()
+
+    @contextmanager
+    def span(self, name: str, model: Optional[gp.Model] = None):
+        """Profiles the block, the model sizes are read at its end (the block should
+        update the model). The block receives a dict where it can set the model when it
+        creates it, e.g. ``context["model"] = build()``."""
+        context = {"model": model}
+        started_tracing = False
+        peak_known = self.trace_memory
+        if self.trace_memory:
+            started_tracing = not tracemalloc.is_tracing()
+            if started_tracing:
+                tracemalloc.start()
+            elif hasattr(tracemalloc, "reset_peak"):
+                tracemalloc.reset_peak()
+            else:  # Python < 3.9 can not reset the peak of a running trace
+                peak_known = False
+            baseline = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        try:
+            yield context
+        finally:
+            duration = time.perf_counter() - start
+            python_peak = None
+            if peak_known:
+                python_peak = tracemalloc.get_traced_memory()[1] - baseline
+            if started_tracing:
+                tracemalloc.stop()
+            sizes = _model_sizes(context["model"])
+            self.spans.append(Span(name, start - self._origin, duration, python_peak, *sizes))
+
+    def summary(self) -> Dict[str, dict]:
+        """``{phase: {duration, python_peak, gurobi_memory, num_vars, ...}}``, phases
+        profiled more than once keep their last span"""
+        return {span.name: span._asdict() for span in self.spans}
+
+    def to_chrome_trace(self, path=None) -> dict:
+        """Trace Event Format dict, loadable in chrome://tracing and Perfetto, also
+        written to ``path`` if given"""
+        pid, tid = os.getpid(), threading.get_ident()
+        trace = {
+            "traceEvents": [
+                {
+                    "name": span.name,
+                    "ph": "X",
+                    "ts": span.start * 1e6,
+                    "dur": span.duration * 1e6,
+                    "pid": pid,
+                    "tid": tid,
+                    "args": {
+                        key: value
+                        for key, value in span._asdict().items()
+                        if key not in ("name", "start", "duration") and value is not None
+                    },
+                }
+                for span in self.spans
+            ],
+            "displayTimeUnit": "ms",
+        }
+        if path is not None:
+            with open(path, "w", encoding="utf-8") as file:
+                json.dump(trace, file)
+        return trace
+
+
+def make_profiler(profile) -> Optional[BuildProfiler]:
+    """Profiler given the profile option of low_sugar.Model and OptModel: None if
+    falsy, without memory tracing if "time" """
+    if not profile:
+        return None
+    return BuildProfiler(trace_memory=profile != "time")
+
+
+def span(profiler: Optional[BuildProfiler], name: str, model: Optional[gp.Model] = None):
+    """``profiler.span(name, model)``, or a no-op context without profiler"""
+    if profiler is None:
+        return nullcontext({"model": model})
+    return profiler.span(name, model)
+
+
+def _model_sizes(model: Optional[gp.Model]) -> tuple:
+    if model is None:
+        return None, None, None, None
+    try:
+        return model.MemUsed, model.NumVars, model.NumConstrs, model.NumNZs
+    except gp.GurobiError:  # e.g. disposed models
+        return None, None, None, None
@@ -0,0 +1,169 @@
+import math
+import multiprocessing
+import os
+import queue
+import tempfile
+import time
+from typing import List, Optional
+
+import gurobipy as gp
+import numpy as np
+
+from . import parallel
+from .model_store import ModelStore
+
+# Seconds the losing racers get to stop after the winner finished before they are killed
+GRACE_PERIOD = 2.0
+# Statuses that end the race
+CONCLUSIVE = (gp.GRB.OPTIMAL, gp.GRB.INFEASIBLE, gp.GRB.INF_OR_UNBD, gp.GRB.UNBOUNDED)
+
+
+def race(
+    model: gp.Model,
+    configs: List[dict],
+    target_gap: Optional[float] = None,
+    cores: Optional[int] = None,
+    share_incumbents: bool = True,
+) -> dict:
+    """Solves copies of the model with every parameter configuration in parallel
+    processes, the cores are split between them through the gurobi Threads parameter.
+    The first racer proving optimality (or reaching ``target_gap``, set as MIPGap on
+    every racer) or infeasibility wins and the others are terminated. If no racer
+    wins (e.g. all hit a TimeLimit) the best solution found is returned. Worker
+    processes are spawned, see parallel.
+
+    :param configs: gurobi parameter sets, e.g. ``[{"MIPFocus": 1}, {"Method": 2}]``
+    :param share_incumbents: racers publish their incumbents and inject the best one
+        found by any racer as a heuristic solution, so every racer prunes with it
+    :return: ``{"winner": position of the winning config, "params", "status",
+        "objective_value", "runtime", "values"}``, values are the variable values
+        (NumPy array aligned with model.getVars()), None without solution
+    """
+    context = multiprocessing.get_context(parallel.MP_CONTEXT)
+    threads = parallel.threads_per_worker(len(configs), cores or os.cpu_count())
+    params = [{"Threads": threads, **config} for config in configs]
+    if target_gap is not None:
+        params = [{"MIPGap": target_gap, **config} for config in params]
+    shared = _SharedIncumbent(context, model.NumVars) if share_incumbents else None
+    stop = context.Event()
+    results = context.Queue()
+    with tempfile.TemporaryDirectory() as directory:
+        store = ModelStore(directory)
+        store.save("race", model)
+        racers = [
+            context.Process(
+                target=_race, args=(store, racer, params[racer], shared, stop, results)
+            )
+            for racer in range(len(configs))
+        ]
+        for racer in racers:
+            racer.start()
+        try:
+            finished = _wait(racers, results)
+        finally:
+            stop.set()
+            _stop(racers, results)
+    conclusive = [result for result in finished if result["status"] in CONCLUSIVE]
+    if conclusive:
+        winner = conclusive[0]
+    else:
+        winner = min(finished, key=_normalizer(model.ModelSense))
+    return {**winner, "params": configs[winner["winner"]]}
+
+
+def _normalizer(sense: int):
+    def normalized_objective(result: dict) -> float:
+        objective = result["objective_value"]
+        return math.inf if math.isnan(objective) else sense * objective
+
+    return normalized_objective
+
+
+class _SharedIncumbent:
+    """Best objective value (normalized for minimization), its solution and a version
+    number bumped on every improvement, guarded by the lock of the solution array"""
+
+    def __init__(self, context, num_vars: int):
+        self.solution = context.Array("d", num_vars)
+        self.objective = context.Value("d", math.inf, lock=False)
+        self.version = context.Value("i", 0, lock=False)
+
+
+class _Racer:
+    def __init__(self, model: gp.Model, shared: Optional[_SharedIncumbent], stop):
+        self.variables = model.getVars()
+        self.sense = model.ModelSense
+        self.shared = shared
+        self.stop = stop
+        self.seen = 0
+
+    def callback(self, model, where) -> None:
+        if self.stop.is_set():
+            model.terminate()
+        elif self.shared is None:
+            return
+        elif where == gp.GRB.Callback.MIPSOL:
+            objective = self.sense * model.cbGet(gp.GRB.Callback.MIPSOL_OBJ)
+            with self.shared.solution.get_lock():
+                if objective < self.shared.objective.value:
+                    self.shared.solution[:] = model.cbGetSolution(self.variables)
+                    self.shared.objective.value = objective
+                    self.shared.version.value += 1
+                    self.seen = self.shared.version.value
+        elif where == gp.GRB.Callback.MIPNODE and self.shared.version.value > self.seen:
+            with self.shared.solution.get_lock():
+                values = self.shared.solution[:]
+                self.seen = self.shared.version.value
+            model.cbSetSolution(self.variables, values)
+            model.cbUseSolution()
+
+
+def _race(store: ModelStore, racer: int, params: dict, shared, stop, results) -> None:
+    with gp.Env(params={"OutputFlag": 0}) as env:
+        model = store.load("race", env)[0]
+        for param, value in params.items():
+            model.setParam(param, value)
+        model.optimize(_Racer(model, shared, stop).callback)
+        solved = model.SolCount > 0
+        results.put(
+            {
+                "winner": racer,
+                "status": model.Status,
+                "objective_value": model.ObjVal if solved else math.nan,
+                "runtime": model.Runtime,
+                "values": np.array(model.getAttr("X", model.getVars())) if solved else None,
+            }
+        )
+        model.dispose()
+
+
+def _wait(racers, results) -> List[dict]:
+    """Results of the racers until one is conclusive or all of them finished"""
+    finished = []
+    while len(finished) < len(racers):
+        try:
+            finished.append(results.get(timeout=0.1))
+        except queue.Empty:
+            if not any(racer.is_alive() for racer in racers) and results.empty():
+                break
+            continue
+        if finished[-1]["status"] in CONCLUSIVE:
+            break
+    if not finished:
+        raise RuntimeError("every racer failed before reporting a result")
+    return finished
+
+
+def _stop(racers, results) -> None:
+    """Joins the (terminating) racers, draining their results so they can exit, the
+    ones still running after the grace period are killed"""
+    deadline = time.monotonic() + GRACE_PERIOD
+    while any(racer.is_alive() for racer in racers) and time.monotonic() < deadline:
+        try:
+            results.get(timeout=0.05)
+        except queue.Empty:
+            pass
+    for racer in racers:
+        if racer.is_alive():
+            racer.terminate()
+        racer.join()
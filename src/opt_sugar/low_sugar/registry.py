@@ -0,0 +1,133 @@
+import weakref
+from typing import Optional
+
+import gurobipy as gp
+
+from .result import VarIndex
+
+# Registries of the models, kept out of the gurobipy model: probing a missing user
+# attribute of a gp.Model leaves an error behind in some gurobipy versions
+_registries = weakref.WeakKeyDictionary()
+
+
+class VarRegistry:
+    """Group name and keys of the variables of a model recorded when they are created,
+    so solutions are grouped without gurobi variable names (see VarIndex.from_groups).
+
+    Every group is stored as the position of its first variable (the variable
+    itself until the model is updated, so adding variables does not update the
+    model), its size and the list of keys of the tupledict, nothing is stored per
+    variable in gurobi. If variables are created without the registry the results
+    are grouped by name (see get_var_index), removing variables invalidates the
+    positions. Names are only set on
+    demand by ``apply_names``, e.g. before writing an LP file.
+    """
+
+    def __init__(self):
+        self.groups = {}
+        self._var_index = None
+
+    def add_vars(self, model: gp.Model, *indices, name: str, **kwargs) -> gp.tupledict:
+        """Same as ``model.addVars`` but the name is recorded instead of set"""
+        variables = model.addVars(*indices, **kwargs)
+        keys = list(variables.keys())
+        if keys and not isinstance(keys[0], tuple):
+            keys = [(key,) for key in keys]
+        self._add(name, next(iter(variables.values()), None), len(keys), keys)
+        return variables
+
+    def add_var(self, model: gp.Model, name: str, **kwargs) -> gp.Var:
+        """Same as ``model.addVar`` but the name is recorded instead of set"""
+        variable = model.addVar(**kwargs)
+        self._add(name, variable, 1, None)
+        return variable
+
+    def _add(self, name: str, first: Optional[gp.Var], count: int, keys: Optional[list]):
+        if name in self.groups:
+            raise ValueError(f"A variable group named {name} is already registered")
+        # The first variable is kept until the model is updated, its index is the start
+        self.groups[name] = (first, count, keys)
+        self._var_index = None
+
+    def _resolve(self) -> None:
+        """Replaces the first variable of every group by its index, the model must be
+        updated since the variables were added"""
+        for name, (first, count, keys) in self.groups.items():
+            if first is None:
+                self.groups[name] = (0, count, keys)
+            elif isinstance(first, gp.Var):
+                if first.index < 0:
+                    raise RuntimeError("The model must be updated before reading the registry")
+                self.groups[name] = (first.index, count, keys)
+
+    def __getstate__(self):
+        self._resolve()
+        return self.__dict__
+
+    def var_index(self) -> VarIndex:
+        if self._var_index is None:
+            self._resolve()
+            self._var_index = VarIndex.from_groups(self.groups)
+        return self._var_index
+
+    def names(self, name: str) -> list:
+        """Gurobi style names of a group, e.g. ``["x[0,a]", "x[0,b]"]``"""
+        _, _, keys = self.groups[name]
+        if keys is None:
+            return [name]
+        return [f"{name}[{','.join(map(str, key))}]" for key in keys]
+
+    def apply_names(self, model: gp.Model) -> None:
+        """Sets the names of every registered variable, needed to write readable LP
+        or MPS files and for debugging."""
+        model.update()
+        self._resolve()
+        variables = model.getVars()
+        for name, (start, count, _) in self.groups.items():
+            model.setAttr("VarName", variables[start : start + count], self.names(name))
+        model.update()
+
+
+def get_registry(model: gp.Model) -> Optional[VarRegistry]:
+    return _registries.get(model)
+
+
+def get_var_index(model: gp.Model) -> Optional[VarIndex]:
+    """Index of the registered variables of the (updated) model, None without registry.
+    If some variables were created without the registry, the registered ones are
+    named (see apply_names) and None is returned, so every variable is grouped by
+    name instead of being left out of the results."""
+    var_registry = get_registry(model)
+    if var_registry is None:
+        return None
+    if sum(count for _, count, _ in var_registry.groups.values()) == model.NumVars:
+        return var_registry.var_index()
+    var_registry.apply_names(model)
+    return None
+
+
+def set_registry(model: gp.Model, var_registry: VarRegistry) -> None:
+    _registries[model] = var_registry
+
+
+def registry(model: gp.Model) -> VarRegistry:
+    """Registry of the model, created on first use"""
+    return _registries.setdefault(model, VarRegistry())
+
+
+def add_vars(model: gp.Model, *indices, name: str, **kwargs) -> gp.tupledict:
+    """Name-free ``model.addVars``, the group and keys are recorded in the registry of
+    the model and used to group the results."""
+    return registry(model).add_vars(model, *indices, name=name, **kwargs)
+
+
+def add_var(model: gp.Model, name: str, **kwargs) -> gp.Var:
+    """Name-free ``model.addVar``, see add_vars"""
+    return registry(model).add_var(model, name, **kwargs)
+
+
+def apply_names(model: gp.Model) -> None:
+    """Names the registered variables of the model, see VarRegistry.apply_names"""
+    var_registry = get_registry(model)
+    if var_registry is not None:
+        var_registry.apply_names(model)
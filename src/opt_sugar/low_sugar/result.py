@@ -0,0 +1,156 @@
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+def parse_var_name(var_name: str) -> Optional[Tuple[str, tuple]]:
+    """Splits a gurobipy variable name like ``"color[3,1]"`` into ``("color", (3, 1))``.
+    Returns None for names that are not indexed (e.g. ``"max_color"``)."""
+    group_name, bracket, index = var_name.partition("[")
+    if not group_name or not bracket or not index.endswith("]"):
+        return None
+    index = tuple(int(ind) if ind.isdigit() else ind for ind in index[:-1].split(","))
+    return group_name, index
+
+
+class VarIndex:
+    """Group structure of the variables of a model, parsed from their names or recorded
+    when they were created (see from_groups).
+
+    Parsing the names is done once, after that ``group`` only slices the values
+    so the same instance can be reused for every solve of a model with the same
+    variable names. Variables of a group that shares its name with a scalar variable
+    or mixes index lengths are kept as scalars under their full names.
+    """
+
+    def __init__(self, names: Optional[List[str]]):
+        self.names = names
+        self.positions = {}
+        self.indices = {}
+        self._columns = {}
+        if names is not None:
+            self._parse(names)
+
+    @classmethod
+    def from_groups(cls, groups: Dict[str, Tuple[int, int, Optional[list]]]) -> "VarIndex":
+        """Index of variables recorded at creation time as ``{group_name: (start, count,
+        keys)}`` (see registry.VarRegistry), keys is None for scalar variables. No
+        name is parsed."""
+        var_index = cls(None)
+        for name, (start, count, keys) in groups.items():
+            var_index.positions[name] = start if keys is None else slice(start, start + count)
+            var_index.indices[name] = keys
+        return var_index
+
+    def _parse(self, names: List[str]) -> None:
+        scalars = {}
+        groups = {}
+        for position, name in enumerate(names):
+            parsed = parse_var_name(name)
+            if parsed is None:
+                scalars[name] = position
+            else:
+                group_name, index = parsed
+                groups.setdefault(group_name, []).append((position, index, name))
+        positions = {name: position for name, position in scalars.items()}
+        indices = dict.fromkeys(scalars)
+        for group_name, members in groups.items():
+            if group_name in scalars or len({len(index) for _, index, _ in members}) > 1:
+                # Ambiguous group (a scalar has its name or the index lengths differ),
+                # its variables are kept as scalars under their full names
+                for position, _, name in members:
+                    positions[name] = position
+                    indices[name] = None
+                continue
+            # Most groups come from a single addVars call, so they are contiguous
+            positions[group_name] = _as_slice([position for position, _, _ in members])
+            indices[group_name] = [index for _, index, _ in members]
+        self.positions = positions
+        self.indices = indices
+
+    def matches(self, names: List[str]) -> bool:
+        return self.names == names
+
+    def group(self, values: list) -> dict:
+        """Groups ``values`` (aligned with ``names``) as ``{group_name: {index: value}}``,
+        scalar variables are mapped directly as ``{name: value}``."""
+        vars_ = {}
+        for name, positions in self.positions.items():
+            indices = self.indices[name]
+            if indices is None:
+                vars_[name] = values[positions]
+            elif isinstance(positions, slice):
+                vars_[name] = dict(zip(indices, values[positions]))
+            else:
+                vars_[name] = dict(zip(indices, (values[p] for p in positions)))
+        return vars_
+
+    def columnar(self, values: np.ndarray) -> Dict[str, "VarGroup"]:
+        """Groups ``values`` (aligned with ``names``) as ``{group_name: VarGroup}``,
+        scalar variables are mapped directly as ``{name: value}``. Groups created by
+        a single addVars call are views on ``values``, no copies are made."""
+        vars_ = {}
+        for name, positions in self.positions.items():
+            if self.indices[name] is None:
+                vars_[name] = float(values[positions])
+            else:
+                vars_[name] = VarGroup(name, values[positions], self.index_columns(name))
+        return vars_
+
+    def index_columns(self, name: str) -> List[np.ndarray]:
+        """One array per index dimension of the group, built once and cached."""
+        if name not in self._columns:
+            self._columns[name] = _index_columns(self.indices[name])
+        return self._columns[name]
+
+
+class VarGroup:
+    """Values of a variable group in columnar form, ``values[i]`` is the value of the
+    variable indexed by ``tuple(column[i] for column in index)``."""
+
+    def __init__(self, name: str, values: np.ndarray, index: List[np.ndarray]):
+        self.name = name
+        self.values = values
+        self.index = index
+
+    def __len__(self):
+        return len(self.values)
+
+    def __repr__(self):
+        return f"VarGroup(name={self.name!r}, size={len(self)}, dims={len(self.index)})"
+
+    def to_dict(self) -> dict:
+        index = zip(*(column.tolist() for column in self.index))
+        return dict(zip(index, self.values.tolist()))
+
+    def to_series(self):
+        """Returns a pandas Series sharing memory with ``values``."""
+        import pandas as pd  # pylint: disable=import-outside-toplevel
+
+        if len(self.index) == 1:
+            index = pd.Index(self.index[0])
+        else:
+            index = pd.MultiIndex.from_arrays(self.index)
+        return pd.Series(self.values, index=index, name=self.name, copy=False)
+
+    def to_frame(self):
+        return self.to_series().to_frame()
+
+
+def _index_columns(indices: List[tuple]) -> List[np.ndarray]:
+    columns = []
+    for column in zip(*indices):
+        if all(isinstance(value, int) for value in column):
+            columns.append(np.fromiter(column, dtype=np.int64, count=len(column)))
+        else:
+            array = np.empty(len(column), dtype=object)
+            array[:] = column
+            columns.append(array)
+    return columns
+
+
+def _as_slice(positions: List[int]):
+    start, stop = positions[0], positions[-1] + 1
+    if stop - start == len(positions):
+        return slice(start, stop)
+    return positions
@@ -0,0 +1,57 @@
+from typing import Optional, Sequence
+
+import gurobipy as gp
+import numpy as np
+
+from .result import VarIndex
+
+VAR_ATTRIBUTES = ("RC", "SAObjLow", "SAObjUp")
+CONSTR_ATTRIBUTES = ("Pi", "Slack", "SARHSLow", "SARHSUp")
+
+
+def get_constr_index(model: gp.Model, cached: Optional[VarIndex] = None) -> VarIndex:
+    """Families of the linear constraints parsed from their names, ``"job[3]"`` belongs
+    to the family "job". The cached index is returned if the names did not change."""
+    names = model.getAttr("ConstrName", model.getConstrs())
+    if cached is not None and cached.matches(names):
+        return cached
+    return VarIndex(names)
+
+
+def read_sensitivity(
+    model: gp.Model,
+    var_index: VarIndex,
+    constr_index: VarIndex,
+    var_attributes: Sequence[str] = VAR_ATTRIBUTES,
+    constr_attributes: Sequence[str] = CONSTR_ATTRIBUTES,
+) -> dict:
+    """Duals, reduced costs, slacks and sensitivity ranges of a solved (continuous)
+    model. Every attribute is read with a single query over all the variables or
+    linear constraints.
+
+    :return: ``{"vars": {attribute: {group: VarGroup}}, "constrs": {attribute:
+        {family: VarGroup}}}``, scalar variables and constraints are mapped to floats.
+        None if gurobi has not computed some attribute, e.g. the ranges of barrier
+        solves without crossover
+    """
+    variables = model.getVars()
+    constrs = model.getConstrs()
+    try:
+        var_values = {
+            attribute: model.getAttr(attribute, variables) for attribute in var_attributes
+        }
+        constr_values = {
+            attribute: model.getAttr(attribute, constrs) for attribute in constr_attributes
+        }
+    except gp.GurobiError:
+        return None
+    return {
+        "vars": {
+            attribute: var_index.columnar(np.array(values))
+            for attribute, values in var_values.items()
+        },
+        "constrs": {
+            attribute: constr_index.columnar(np.array(values))
+            for attribute, values in constr_values.items()
+        },
+    }
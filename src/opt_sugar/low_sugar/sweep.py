@@ -0,0 +1,132 @@
+import multiprocessing
+import os
+import random
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import product
+from typing import Callable, Dict, Iterable, List, Optional
+
+import gurobipy as gp
+import numpy as np
+
+from . import parallel
+from .model_store import ModelStore
+
+METRICS = ("status", "runtime", "work", "objective", "bound", "gap", "node_count")
+
+_worker_env = None
+_worker_store = None
+_worker_models = {}
+
+
+def parameter_grid(space: Dict[str, Iterable]) -> List[dict]:
+    """Every combination of the parameter values, e.g. ``{"MIPFocus": [0, 1, 2, 3]}``"""
+    names = list(space)
+    return [dict(zip(names, values)) for values in product(*space.values())]
+
+
+def random_configs(space: Dict[str, object], n_configs: int, seed: Optional[int] = None):
+    """Parameter sets sampled from the space, a value is picked from a sequence of
+    values or drawn by a function receiving a random.Random, e.g.
+    ``{"MIPFocus": [0, 1, 2, 3], "Heuristics": lambda rng: rng.uniform(0, 0.5)}``"""
+    rng = random.Random(seed)
+    return [
+        {
+            name: values(rng) if callable(values) else rng.choice(list(values))
+            for name, values in space.items()
+        }
+        for _ in range(n_configs)
+    ]
+
+
+def sweep(
+    build: Callable[[object], gp.Model],
+    datasets: Iterable,
+    configs: List[dict],
+    replications: int = 1,
+    threads: int = 1,
+    cores: Optional[int] = None,
+) -> Dict[str, np.ndarray]:
+    """Solves every instance with every parameter configuration ``replications``
+    times. Each instance is built once and written to a temporary model store, worker
+    processes read it once and solve a copy per run. Runs are executed concurrently
+    with ``threads`` gurobi threads each, as many at a time as fit in ``cores``.
+    Replication r sets the gurobi Seed to r unless the configuration sets it. Worker
+    processes are spawned, see parallel.
+
+    :param build: function receiving the data and returning a gurobipy model, the
+        parameters it sets are kept
+    :param configs: gurobi parameter sets, see parameter_grid and random_configs
+    :param cores: core budget of the sweep, by default the number of cores
+    :return: table as ``{column: array}`` with a row per run, the columns are
+        "instance", "config", "replication", the parameters and METRICS (e.g.
+        ``pd.DataFrame(table)``). Metrics missing for a run (e.g. the gap of a
+        continuous model) are NaN
+    """
+    cores = cores or os.cpu_count() or 1
+    runs = []
+    with tempfile.TemporaryDirectory() as directory:
+        store = ModelStore(directory)
+        for instance, data in enumerate(datasets):
+            model = build(data)
+            store.save(str(instance), model)
+            model.dispose()
+            runs.extend(
+                (instance, config, replication)
+                for config in range(len(configs))
+                for replication in range(replications)
+            )
+        max_workers = max(1, min(cores // threads, len(runs)))
+        metrics = [None] * len(runs)
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context(parallel.MP_CONTEXT),
+            initializer=_start_worker,
+            initargs=(store,),
+        ) as executor:
+            futures = {
+                executor.submit(
+                    _solve, str(instance), {"Seed": replication, **configs[config]}, threads
+                ): position
+                for position, (instance, config, replication) in enumerate(runs)
+            }
+            for future in as_completed(futures):
+                metrics[futures[future]] = future.result()
+    return _table(runs, configs, metrics)
+
+
+def _table(runs, configs, metrics) -> Dict[str, np.ndarray]:
+    instances, config_positions, replications = (np.array(column) for column in zip(*runs))
+    table = {"instance": instances, "config": config_positions, "replication": replications}
+    for name in dict.fromkeys(name for config in configs for name in config):
+        table[name] = np.array([configs[config].get(name) for config in config_positions])
+    for column, metric in enumerate(METRICS):
+        table[metric] = np.array([run[column] for run in metrics], dtype=float)
+    table["status"] = table["status"].astype(int)
+    return table
+
+
+def _start_worker(store: ModelStore) -> None:
+    global _worker_env, _worker_store  # pylint: disable=global-statement
+    _worker_env = gp.Env(params={"OutputFlag": 0})
+    _worker_store = store
+
+
+def _solve(key: str, params: dict, threads: int) -> tuple:
+    if key not in _worker_models:
+        _worker_models[key] = _worker_store.load(key, _worker_env)[0]
+    with _worker_models[key].copy() as model:
+        model.Params.Threads = threads
+        for param, value in params.items():
+            model.setParam(param, value)
+        model.optimize()
+        solved = model.SolCount > 0
+        return (
+            model.Status,
+            model.Runtime,
+            model.Work,
+            model.ObjVal if solved else np.nan,
+            model.ObjBound if model.IsMIP else np.nan,
+            model.MIPGap if model.IsMIP and solved else np.nan,
+            model.NodeCount if model.IsMIP else np.nan,
+        )
@@ -0,0 +1,91 @@
+from statistics import mean
+from typing import List, Optional
+
+import gurobipy as gp
+
+POLICIES = ("last", "best")
+
+
+class WarmStartStore:
+    """Keeps a solution per model name and uses it as MIP start (``Start`` attribute)
+    for the next model built with the same name, variables are matched by name.
+
+    :param policy: "last" keeps the last solution found, "best" keeps the one with the
+        best objective value
+    """
+
+    def __init__(self, policy: str = "last"):
+        if policy not in POLICIES:
+            raise ValueError(f"policy should be one of {POLICIES}")
+        self.policy = policy
+        self.history: List[dict] = []
+        self._solutions = {}
+
+    def apply(self, model: gp.Model) -> bool:
+        """Sets the stored solution as start of the model, returns whether there was
+        one. Variables without a stored value are left undefined."""
+        solution = self._solutions.get(model.ModelName)
+        if solution is None:
+            return False
+        variables = model.getVars()
+        names = model.getAttr("VarName", variables)
+        if names == solution["names"]:
+            starts = solution["values"]
+        else:
+            values = dict(zip(solution["names"], solution["values"]))
+            starts = [values.get(name, gp.GRB.UNDEFINED) for name in names]
+        model.setAttr("Start", variables, starts)
+        return True
+
+    def record(self, model: gp.Model, warm_started: bool) -> None:
+        """Stores the solution of the optimized model and its runtime and work."""
+        run = {
+            "model_name": model.ModelName,
+            "warm_started": warm_started,
+            "runtime": model.RunTime,
+            "work": getattr(model, "Work", None),
+            "objective_value": model.ObjVal if model.SolCount else None,
+        }
+        self.history.append(run)
+        if not model.SolCount or not self._improves(model):
+            return
+        variables = model.getVars()
+        self._solutions[model.ModelName] = {
+            "names": model.getAttr("VarName", variables),
+            "values": model.getAttr("X", variables),
+            "objective_value": model.ObjVal,
+        }
+
+    def _improves(self, model: gp.Model) -> bool:
+        solution = self._solutions.get(model.ModelName)
+        if self.policy == "last" or solution is None:
+            return True
+        return model.ModelSense * (model.ObjVal - solution["objective_value"]) < 0
+
+    def clear(self, model_name: Optional[str] = None) -> None:
+        if model_name is None:
+            self._solutions.clear()
+        else:
+            self._solutions.pop(model_name, None)
+
+    def savings(self, model_name: Optional[str] = None) -> dict:
+        """Compares the mean runtime and work of cold and warm started runs.
+
+        :return: dict with the cold and warm means and the relative savings, the values
+            are None when there are no runs of one of the kinds
+        """
+        runs = [
+            run for run in self.history if model_name in (None, run["model_name"])
+        ]
+        summary = {}
+        for metric in ("runtime", "work"):
+            cold = [r[metric] for r in runs if not r["warm_started"] and r[metric] is not None]
+            warm = [r[metric] for r in runs if r["warm_started"] and r[metric] is not None]
+            cold_mean = mean(cold) if cold else None
+            warm_mean = mean(warm) if warm else None
+            summary[f"cold_{metric}"] = cold_mean
+            summary[f"warm_{metric}"] = warm_mean
+            summary[f"{metric}_saved"] = (
+                1 - warm_mean / cold_mean if cold_mean and warm_mean is not None else None
+            )
+        return summary
@@ -0,0 +1,58 @@
+from itertools import product
+import pytest
+import gurobipy as gp
+from src.opt_sugar.extra_sugar.indexed import IndexedVars
+
+
+@pytest.fixture
+def variables():
+    with gp.Model("indexed") as model:
+        x = model.addVars(product(range(3), "ab", range(4)), name="x")
+        model.update()
+        yield x, IndexedVars(x)
+
+
+def terms(expr):
+    return sorted((expr.getVar(i).index, expr.getCoeff(i)) for i in range(expr.size()))
+
+
+# pylint: disable=no-self-use, redefined-outer-name
+@pytest.mark.unit
+class TestIndexedVars:
+    def test_select_matches_tupledict(self, variables):
+        x, indexed = variables
+        for pattern in [(1, "*", 2), ("*", "b", "*"), ("*", "*", "*"), (2, "a", 3), (5, "*", 0)]:
+            assert indexed.select(*pattern) == x.select(*pattern)
+        assert set(indexed.select([0, 2], "*", [1])) == set(x.select([0, 2], "*", [1]))
+
+    def test_sum_and_prod(self, variables):
+        x, indexed = variables
+        coeff = {key: key[0] + key[2] for key in x if key[1] == "a"}
+        for pattern in [("*", "a", 1), (0, "*", "*")]:
+            assert terms(indexed.sum(*pattern)) == terms(x.sum(*pattern))
+            assert terms(indexed.prod(coeff, *pattern)) == terms(x.prod(coeff, *pattern))
+
+    def test_assignment_drops_indexes(self, variables):
+        x, indexed = variables
+        assert len(indexed.select(0, "a", "*")) == 4
+        del indexed[0, "a", 0]
+        assert len(indexed.select(0, "a", "*")) == 3
+        indexed[0, "a", 0] = x[0, "a", 0]
+        assert len(indexed.select(0, "a", "*")) == 4
+
+    def test_mutation_drops_indexes(self, variables):
+        x, indexed = variables
+        assert len(indexed.select(0, "*")) == 8
+        indexed.pop((0, "a", 0))
+        assert len(indexed.select(0, "*")) == 7
+        indexed.update({(0, "a", 0): x[0, "a", 0]})
+        assert len(indexed.select(0, "*")) == 8
+        indexed.setdefault((3, "a", 0), x[0, "a", 0])
+        assert len(indexed.select(3, "*", "*")) == 1
+        indexed.clear()
+        assert not indexed.select(3, "*", "*")
+
+    def test_partial_pattern(self, variables):
+        x, indexed = variables
+        assert indexed.select(1) == x.select(1, "*", "*")
+        assert indexed.select(1, "b") == x.select(1, "b", "*")
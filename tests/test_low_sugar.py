@@ -0,0 +1,497 @@
+import asyncio
+from itertools import product
+import random
+import threading
+import time
+import numpy as np
+import pytest
+import gurobipy as gp
+from src.opt_sugar import low_sugar
+from src.opt_sugar.low_sugar.registry import apply_names, get_registry
+from src.opt_sugar.low_sugar.fingerprint import callable_fingerprint, fingerprint
+from src.opt_sugar.low_sugar.log_capture import NodeLogCapture
+from src.opt_sugar.low_sugar.parallel import threads_per_worker
+from src.opt_sugar.low_sugar.result import VarIndex, parse_var_name
+from src.opt_sugar.low_sugar.sweep import parameter_grid, random_configs
+
+
+def build_assignment(data, env=None, add_vars=gp.Model.addVars, add_var=gp.Model.addVar):
+    m = gp.Model("assignment", env=env)
+    m.Params.OutputFlag = 0
+    workers, jobs = data["workers"], data["jobs"]
+    assign = add_vars(m, product(workers, jobs), vtype="B", name="assign")
+    makespan = add_var(m, name="makespan")
+    for worker in workers:
+        m.addConstr(assign.sum(worker, "*") == 1, name=f"worker_{worker}")
+    for job in jobs:
+        m.addConstr(assign.sum("*", job) <= 1, name=f"job_{job}")
+        m.addConstr(
+            makespan >= gp.quicksum(
+                data["cost"][worker][job] * assign[worker, job] for worker in workers
+            ),
+            name=f"makespan_{job}",
+        )
+    m.setObjective(makespan + assign.prod(data["penalty"]), gp.GRB.MINIMIZE)
+    low_sugar.bind(m, "Obj", assign, lambda data_: data_["penalty"])
+    return m
+
+
+def build_name_free_assignment(data, env=None):
+    return build_assignment(data, env, low_sugar.add_vars, low_sugar.add_var)
+
+
+def make_build(extra_cost):
+    def build(data, env=None):
+        model = build_assignment(data, env)
+        model.ObjCon = extra_cost
+        return model
+
+    return build
+
+
+def build_transport(data, env=None):
+    m = gp.Model("transport", env=env)
+    m.Params.OutputFlag = 0
+    ship = m.addVars(data["cost"].keys(), name="ship")
+    m.addConstrs(
+        (ship.sum(plant, "*") <= supply for plant, supply in data["supply"].items()),
+        name="supply",
+    )
+    m.addConstrs(
+        (ship.sum("*", market) >= demand for market, demand in data["demand"].items()),
+        name="demand",
+    )
+    m.setObjective(ship.prod(data["cost"]), gp.GRB.MINIMIZE)
+    return m
+
+
+def build_market_split(data):
+    """Small but hard feasibility model, used to have solves worth cancelling"""
+    rng = random.Random(data["seed"])
+    m = gp.Model("market_split")
+    m.Params.OutputFlag = 0
+    pick = m.addVars(data["size"], vtype="B", name="pick")
+    for row in range(data["rows"]):
+        weights = [rng.randint(0, 99) for _ in range(data["size"])]
+        m.addConstr(pick.prod(dict(enumerate(weights))) == sum(weights) // 2, name=f"split_{row}")
+    return m
+
+
+def stop_at_first_solution(model, where):
+    if where == gp.GRB.Callback.MIPSOL:
+        model.terminate()
+
+
+@pytest.fixture
+def assignment_data():
+    workers = ["ana", "bob", "cid"]
+    jobs = [0, 1, 2]
+    cost = {"ana": [1, 4, 5], "bob": [3, 1, 6], "cid": [6, 5, 1]}
+    return {
+        "workers": workers,
+        "jobs": jobs,
+        "cost": cost,
+        "penalty": {(w, j): 0.01 * cost[w][j] for w, j in product(workers, jobs)},
+    }
+
+
+# pylint: disable=no-self-use, redefined-outer-name
+@pytest.mark.unit
+class TestResult:
+    def test_parse_var_name(self):
+        assert parse_var_name("color[3,1]") == ("color", (3, 1))
+        assert parse_var_name("pick[ana,2]") == ("pick", ("ana", 2))
+        assert parse_var_name("max_color") is None
+
+    def test_group(self):
+        var_index = VarIndex(["x[0]", "max", "y[a,1]", "x[1]", "y[b,2]"])
+        assert var_index.group([1, 2, 3, 4, 5]) == {
+            "x": {(0,): 1, (1,): 4},
+            "max": 2,
+            "y": {("a", 1): 3, ("b", 2): 5},
+        }
+
+    def test_group_ambiguous_names(self):
+        # a scalar and a group with the same name keep their full names, in any order
+        for names in (["x", "x[0]", "x[1]"], ["x[0]", "x[1]", "x"]):
+            assert VarIndex(names).group([1, 2, 3]) == dict(zip(names, [1, 2, 3]))
+        mixed = VarIndex(["y[0]", "y[0,a]", "z[1]"])
+        assert mixed.group([1, 2, 3]) == {"y[0]": 1, "y[0,a]": 2, "z": {(1,): 3}}
+        assert mixed.columnar(np.array([1.0, 2.0, 3.0]))["y[0,a]"] == 2.0
+
+    def test_fingerprint(self):
+        data = {"nodes": {3, 1, 2}, "edges": [(1, 0)], "demand": {"a": 1.5, 2: None}}
+        same = {"demand": {2: None, "a": 1.5}, "edges": [(1, 0)], "nodes": {2, 3, 1}}
+        assert fingerprint(data) == fingerprint(same)
+        assert fingerprint(data) != fingerprint({**data, "edges": [(0, 1)]})
+        assert fingerprint(1) != fingerprint(True) != fingerprint(1.0)
+        assert fingerprint(np.arange(3)) != fingerprint(np.arange(3.0))
+
+    def test_registry(self):
+        with gp.Model() as model:
+            x = low_sugar.add_vars(model, 3, name="x")
+            model.addVar(name="unregistered")
+            low_sugar.add_var(model, name="y")
+            assert model.NumVars == 0  # the model is not updated by the registry
+            apply_names(model)
+            assert model.getAttr("VarName", model.getVars())[-2:] == ["unregistered", "y"]
+            assert x[2].VarName == "x[2]"
+            assert get_registry(model).var_index().group([0, 1, 2, 3, 4]) == {
+                "x": {(0,): 0, (1,): 1, (2,): 2},
+                "y": 4,
+            }
+
+    def test_callable_fingerprint(self):
+        assert callable_fingerprint(make_build(0)) == callable_fingerprint(make_build(0))
+        assert callable_fingerprint(make_build(0)) != callable_fingerprint(make_build(50))
+        assert callable_fingerprint(lambda x: x) != callable_fingerprint(lambda x: -x)
+
+    def test_columnar(self):
+        values = np.array([1.0, 2.0, 3.0, 4.0])
+        vars_ = VarIndex(["x[0,a]", "x[1,b]", "x[2,c]", "max"]).columnar(values)
+        assert vars_["max"] == 4.0
+        assert np.shares_memory(vars_["x"].values, values)
+        assert vars_["x"].index[0].dtype == np.int64
+        assert vars_["x"].to_dict() == {(0, "a"): 1.0, (1, "b"): 2.0, (2, "c"): 3.0}
+        series = vars_["x"].to_series()
+        assert np.shares_memory(series.values, values)
+        assert series[2, "c"] == 3.0
+
+
+# pylint: disable=no-self-use
+@pytest.mark.unit
+class TestNodeLogCapture:
+    node_log = (
+        "Root relaxation: objective 6.875728e+02, 6 iterations, 0.00 seconds\n\n"
+        "    Nodes    |    Current Node    |     Objective Bounds      |     Work\n"
+        " Expl Unexpl |  Obj  Depth IntInf | Incumbent    BestBd   Gap | It/Node Time\n\n"
+        "     0     0  687.57281    0    3      -      687.57281      -     -    0s\n"
+        "H    0     0                     648.0000000  687.57281  6.11%     -    0s\n"
+        "     0     0     cutoff    0       678.00000  678.00000  0.00%     -    2s\n\n"
+        "Explored 1 nodes (31 simplex iterations) in 0.00 seconds\n"
+    )
+
+    def test_feed(self):
+        capture = NodeLogCapture()
+        # messages may split lines
+        for start in range(0, len(self.node_log), 50):
+            capture.feed(self.node_log[start:start + 50])
+        progress = capture.progress()
+        assert progress["time"].tolist() == [0, 0, 2]
+        assert np.isnan(progress["incumbent"][0])
+        assert progress["incumbent"][1:].tolist() == [648, 678]
+        assert progress["gap"][1] == pytest.approx(0.0611)
+        assert progress["new_solution"].tolist() == [0, 1, 0]
+
+    def test_empty(self):
+        assert len(NodeLogCapture().progress()["bound"]) == 0
+
+
+# pylint: disable=no-self-use, redefined-outer-name
+@pytest.mark.unit
+class TestModel:
+    def test_optimize(self, assignment_data):
+        opt_model = low_sugar.Model(build_assignment)
+        result = opt_model.optimize(assignment_data)
+        assert result["objective_value"] == pytest.approx(1.03)
+        assert result["vars"]["assign"]["ana", 0] == pytest.approx(1)
+        assert result["vars"]["makespan"] == pytest.approx(1)
+
+    def test_optimize_ambiguous_names(self):
+        def build(data):
+            model = gp.Model()
+            model.Params.OutputFlag = 0
+            model.addVar(name="x")
+            model.addVars(2, name="x")
+            return model
+
+        assert low_sugar.Model(build).optimize(None)["vars"] == {"x": 0, "x[0]": 0, "x[1]": 0}
+
+    def test_optimize_name_free(self, assignment_data):
+        result = low_sugar.Model(build_name_free_assignment).optimize(assignment_data)
+        assert result["objective_value"] == pytest.approx(1.03)
+        assert result["vars"]["assign"]["ana", 0] == pytest.approx(1)
+        assert result["vars"]["makespan"] == pytest.approx(1)
+        columnar = low_sugar.Model(build_name_free_assignment, result_format="columnar")
+        assign = columnar.optimize(assignment_data)["vars"]["assign"]
+        assert assign.to_series()["ana", 0] == pytest.approx(1)
+        # variables created without the registry are grouped by name with the others
+        mixed = low_sugar.Model(
+            lambda data: build_assignment(data, add_vars=low_sugar.add_vars)
+        ).optimize(assignment_data)
+        assert mixed["vars"] == result["vars"]
+
+    def test_profile(self, assignment_data):
+        result = low_sugar.Model(build_assignment, profile=True).optimize(assignment_data)
+        profile = result["profile"].summary()
+        assert list(profile) == ["build", "optimize", "extract"]
+        assert profile["build"]["num_vars"] == 10
+        assert profile["optimize"]["duration"] > 0
+
+    def test_solution_pool(self, assignment_data):
+        params = {"PoolSearchMode": 2, "PoolSolutions": 10}
+        result = low_sugar.Model(build_name_free_assignment, pool_size=3).optimize(
+            assignment_data, params=params
+        )
+        pool = result["pool"]
+        assert len(pool) == 3
+        assert pool.values.shape == (3, 10)
+        assert pool.objective_values[0] == pytest.approx(result["objective_value"])
+        assert list(pool.objective_values) == sorted(pool.objective_values)
+        assert pool[0]["assign"] == pytest.approx(result["vars"]["assign"])
+        columnar = low_sugar.Model(
+            build_assignment, result_format="columnar", pool_size=10
+        ).optimize(assignment_data, params=params)["pool"]
+        assert len(columnar) > 3
+        assert columnar[2]["assign"].to_dict() == pytest.approx(pool[2]["assign"])
+
+    def test_sensitivity(self):
+        data = {
+            "supply": {"p": 3, "q": 3},
+            "demand": {0: 2, 1: 2},
+            "cost": {("p", 0): 1, ("p", 1): 3, ("q", 0): 2, ("q", 1): 1},
+        }
+        opt_model = low_sugar.Model(build_transport, sensitivity=True)
+        sensitivity = opt_model.optimize(data)["sensitivity"]
+        assert list(sensitivity["constrs"]["Pi"]["demand"].values) == [1, 1]
+        assert list(sensitivity["constrs"]["Slack"]["supply"].values) == [1, 1]
+        reduced_costs = sensitivity["vars"]["RC"]["ship"].to_dict()
+        assert reduced_costs == {("p", 0): 0, ("p", 1): 2, ("q", 0): 1, ("q", 1): 0}
+        assert set(sensitivity["vars"]) == {"RC", "SAObjLow", "SAObjUp"}
+        constr_index = opt_model._constr_index
+        opt_model.optimize(data)
+        assert opt_model._constr_index is constr_index
+        assert "sensitivity" not in low_sugar.Model(build_transport).optimize(data)
+
+    def test_sensitivity_shared_name(self):
+        def build(data):
+            m = gp.Model("capacity")
+            m.Params.OutputFlag = 0
+            pick = m.addVars(data["sizes"].keys(), ub=1, name="pick")
+            m.addConstr(pick.prod(data["sizes"]) <= data["capacity"], name="capacity")
+            m.addConstrs((pick[item] <= 1 for item in data["sizes"]), name="capacity")
+            m.setObjective(pick.sum(), gp.GRB.MAXIMIZE)
+            return m
+
+        data = {"sizes": {"a": 2, "b": 3}, "capacity": 4}
+        sensitivity = low_sugar.Model(build, sensitivity=True).optimize(data)["sensitivity"]
+        slack = sensitivity["constrs"]["Slack"]
+        assert set(slack) == {"capacity", "capacity[a]", "capacity[b]"}
+        assert slack["capacity"] == pytest.approx(0)
+
+    def test_sensitivity_unavailable(self):
+        data = {
+            "supply": {"p": 3, "q": 3},
+            "demand": {0: 2, 1: 2},
+            "cost": {("p", 0): 1, ("p", 1): 3, ("q", 0): 2, ("q", 1): 1},
+        }
+        # barrier without crossover has duals but no basis, so no sensitivity ranges
+        params = {"Method": 2, "Crossover": 0}
+        result = low_sugar.Model(build_transport, sensitivity=True).optimize(data, params=params)
+        assert result["sensitivity"] is None
+        assert result["objective_value"] == pytest.approx(4)
+
+    def test_sensitivity_mip(self, assignment_data):
+        opt_model = low_sugar.Model(build_assignment, sensitivity=True)
+        result = opt_model.optimize(assignment_data)
+        assert result["sensitivity"] is None
+        assert result["objective_value"] == pytest.approx(1.03)
+
+    def test_model_store(self, assignment_data, tmp_path):
+        store = low_sugar.ModelStore(tmp_path)
+        opt_model = low_sugar.Model(build_name_free_assignment, model_store=store)
+        results = [
+            opt_model.optimize(assignment_data, lambda model: {"log": model.Params.OutputFlag})
+            for _ in range(2)
+        ]
+        assert store.stats()["hits"] == 1
+        assert results[0] == results[1]
+        assert results[1]["callback_result"] == {"log": 0}
+        closures = [
+            low_sugar.Model(build, model_store=store).optimize(assignment_data)
+            for build in (make_build(0), make_build(50))
+        ]
+        assert [result["objective_value"] for result in closures] == pytest.approx([1.03, 51.03])
+        assert store.stats()["hits"] == 1
+
+    def test_no_solution_error(self, assignment_data):
+        # gurobipy reports the missing solution, not a user attribute probed before
+        with pytest.raises(gp.GurobiError, match="'X'"):
+            low_sugar.Model(build_assignment).optimize(assignment_data, params={"TimeLimit": 0})
+
+    def test_var_index_is_reused(self, assignment_data):
+        opt_model = low_sugar.Model(build_assignment)
+        opt_model.optimize(assignment_data)
+        var_index = opt_model._var_index
+        opt_model.optimize(assignment_data)
+        assert opt_model._var_index is var_index
+
+    def test_optimize_columnar(self, assignment_data):
+        opt_model = low_sugar.Model(build_assignment, result_format="columnar")
+        result = opt_model.optimize(assignment_data)
+        assign = result["vars"]["assign"]
+        assert len(assign) == 9
+        assert assign.values.sum() == pytest.approx(3)
+        assert assign.to_series()["ana", 0] == pytest.approx(1)
+
+    def test_optimize_many(self, assignment_data):
+        opt_model = low_sugar.Model(build_assignment)
+        penalties = [0.01, 0.02]
+        datasets = [
+            {**assignment_data, "penalty": {k: p for k in assignment_data["penalty"]}}
+            for p in penalties
+        ]
+        results = opt_model.optimize_many(datasets, max_workers=2)
+        assert [result["objective_value"] for result in results] == pytest.approx(
+            [1.03, 1.06]
+        )
+        unordered = dict(opt_model.optimize_many(datasets, max_workers=2, ordered=False))
+        assert unordered[1]["objective_value"] == pytest.approx(1.06)
+
+    def test_sweep_params(self, assignment_data):
+        opt_model = low_sugar.Model(build_assignment)
+        datasets = [
+            {**assignment_data, "penalty": {k: p for k in assignment_data["penalty"]}}
+            for p in (0.01, 0.02)
+        ]
+        configs = parameter_grid({"MIPFocus": [0, 1], "Presolve": [0]})
+        table = opt_model.sweep_params(datasets, configs, replications=2, cores=2)
+        assert len(table["runtime"]) == 8
+        assert list(table["instance"]) == [0] * 4 + [1] * 4
+        assert list(table["MIPFocus"]) == [0, 0, 1, 1] * 2
+        assert list(table["replication"]) == [0, 1] * 4
+        assert table["objective"] == pytest.approx([1.03] * 4 + [1.06] * 4)
+        assert (table["status"] == gp.GRB.OPTIMAL).all()
+        assert (table["gap"] <= 1e-4).all()
+
+    def test_race(self, assignment_data):
+        opt_model = low_sugar.Model(build_name_free_assignment, result_format="columnar")
+        configs = [{"MIPFocus": 1}, {"MIPFocus": 2, "Heuristics": 0}]
+        result = opt_model.race(assignment_data, configs, cores=2)
+        assert result["objective_value"] == pytest.approx(1.03)
+        assert result["vars"]["assign"].to_dict()["ana", 0] == pytest.approx(1)
+        assert result["race"]["status"] == gp.GRB.OPTIMAL
+        assert result["race"]["params"] == configs[result["race"]["winner"]]
+        limited = low_sugar.Model(build_market_split).race(
+            {"seed": 1, "size": 50, "rows": 5}, [{"NodeLimit": 1}, {"NodeLimit": 2}], cores=2
+        )
+        assert limited["race"]["status"] == gp.GRB.NODE_LIMIT
+
+    def test_random_configs(self):
+        space = {"MIPFocus": [0, 1, 2, 3], "Heuristics": lambda rng: rng.uniform(0, 0.5)}
+        configs = random_configs(space, 5, seed=1)
+        assert configs == random_configs(space, 5, seed=1)
+        assert all(0 <= config["Heuristics"] <= 0.5 for config in configs)
+        assert {config["MIPFocus"] for config in configs} <= {0, 1, 2, 3}
+
+    def test_keep_model(self, assignment_data):
+        opt_model = low_sugar.Model(build_assignment, keep_model=True)
+        opt_model.optimize(assignment_data)
+        model = opt_model._model
+        penalty = {k: 0.02 for k in assignment_data["penalty"]}
+        result = opt_model.optimize({**assignment_data, "penalty": penalty})
+        assert opt_model._model is model
+        assert result["objective_value"] == pytest.approx(1.06)
+
+    def test_warm_start(self, assignment_data):
+        store = low_sugar.WarmStartStore(policy="best")
+        opt_model = low_sugar.Model(build_assignment, warm_start=store)
+        opt_model.optimize(assignment_data)
+        opt_model.optimize(assignment_data)
+        assert [run["warm_started"] for run in store.history] == [False, True]
+        assert store.history[1]["objective_value"] == pytest.approx(1.03)
+        assert set(store.savings()) == {
+            "cold_runtime", "warm_runtime", "runtime_saved",
+            "cold_work", "warm_work", "work_saved",
+        }
+
+    def test_aoptimize(self, assignment_data):
+        async def optimize():
+            progress = low_sugar.ProgressStream()
+            opt_model = low_sugar.Model(build_assignment)
+            task = asyncio.create_task(opt_model.aoptimize(assignment_data, progress=progress))
+            events = [event async for event in progress]
+            return await task, events
+
+        result, events = asyncio.run(optimize())
+        assert result["objective_value"] == pytest.approx(1.03)
+        assert all(isinstance(event, low_sugar.ProgressEvent) for event in events)
+
+    def test_aoptimize_cancel(self):
+        async def optimize_and_cancel():
+            opt_model = low_sugar.Model(build_market_split)
+            task = asyncio.create_task(opt_model.aoptimize({"seed": 1, "size": 50, "rows": 5}))
+            await asyncio.sleep(0.5)
+            task.cancel()
+            start = time.perf_counter()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            return time.perf_counter() - start
+
+        assert asyncio.run(optimize_and_cancel()) < 5
+
+    def test_cache(self, assignment_data):
+        cache = low_sugar.MemoryCache(max_items=1)
+        opt_model = low_sugar.Model(build_assignment, cache=cache)
+        opt_model.optimize(assignment_data)
+        opt_model.optimize(assignment_data)
+        opt_model.optimize(assignment_data, params={"MIPFocus": 1})
+        assert cache.stats() == {"hits": 1, "misses": 2, "evictions": 1, "hit_rate": 1 / 3}
+
+    def test_cache_copies(self, assignment_data):
+        opt_model = low_sugar.Model(build_assignment, cache=low_sugar.MemoryCache(), profile=True)
+        first = opt_model.optimize(assignment_data)
+        first["objective_value"] = None
+        second = opt_model.optimize(assignment_data)
+        assert second["objective_value"] == pytest.approx(1.03)
+        assert "profile" in first and "profile" not in second
+
+    def test_memory_cache_max_bytes(self):
+        cache = low_sugar.MemoryCache(max_bytes=2500)
+        for key in "abc":
+            cache.put(key, bytes(1000))
+        assert len(cache) == 2 and cache.get("a") is None
+        assert cache.get("c") == bytes(1000)
+        cache.put("lock", threading.Lock())
+        assert cache.get("lock") is None and cache.stats()["evictions"] == 1
+
+    def test_cache_only_optimal(self, assignment_data):
+        cache = low_sugar.MemoryCache()
+        opt_model = low_sugar.Model(build_assignment, cache=cache)
+        for _ in range(2):
+            opt_model.optimize(assignment_data, solve_callback=stop_at_first_solution)
+        assert cache.stats()["hits"] == 0
+
+    def test_cache_key(self, assignment_data):
+        cache = low_sugar.MemoryCache()
+        results = [
+            low_sugar.Model(build, cache=cache).optimize(assignment_data)
+            for build in (make_build(0), make_build(50))
+        ]
+        assert [result["objective_value"] for result in results] == pytest.approx([1.03, 51.03])
+        opt_model = low_sugar.Model(build_assignment, cache=cache)
+        opt_model.optimize(assignment_data, callback=lambda model: {"runtime": 1})
+        result = opt_model.optimize(assignment_data, callback=lambda model: {"status": 2})
+        assert result["callback_result"] == {"status": 2}
+        assert cache.stats()["hits"] == 0
+
+    def test_env_pool(self, assignment_data):
+        env_pool = low_sugar.EnvPool(size=2, params={"OutputFlag": 0})
+
+        async def optimize_concurrently():
+            opt_models = [low_sugar.Model(build_assignment, env_pool=env_pool) for _ in range(4)]
+            return await asyncio.gather(
+                *(opt_model.aoptimize(assignment_data) for opt_model in opt_models)
+            )
+
+        results = asyncio.run(optimize_concurrently())
+        assert [result["objective_value"] for result in results] == pytest.approx([1.03] * 4)
+        metrics = env_pool.metrics()
+        assert metrics["environments"] == 2
+        assert metrics["acquisitions"] == 4
+        assert metrics["startup_time_saved"] == pytest.approx(2 * metrics["mean_startup_time"])
+        env_pool.close()
+
+    def test_threads_per_worker(self):
+        assert threads_per_worker(4, cpu_count=16) == 4
+        assert threads_per_worker(32, cpu_count=16) == 1
@@ -0,0 +1,80 @@
+import json
+import pytest
+import gurobipy as gp
+from src.opt_sugar.extra_sugar import ObjectivePart, BaseObjective, Objective
+from src.opt_sugar.extra_sugar.objective import pretty_json_str
+
+
+@pytest.fixture
+def model():
+    with gp.Model("objective") as model:
+        model.Params.OutputFlag = 0
+        yield model
+
+
+# pylint: disable=no-self-use, redefined-outer-name
+@pytest.mark.unit
+class TestBaseObjective:
+    def test_pretty_json_str(self):
+        assert pretty_json_str("{'weight': 1}") == pretty_json_str({"weight": 1})
+
+    def test_build_linear(self, model):
+        x = model.addVars(3, name="x")
+        model.update()
+        parts = [
+            ObjectivePart(weight=2, expr=x.sum()),
+            ObjectivePart(weight=0.5, expr=x[0]),
+            ObjectivePart(weight=3, expr=4),
+        ]
+        expr = BaseObjective(parts, hierarchy=1).build()
+        assert isinstance(expr, gp.LinExpr)
+        assert expr.getConstant() == 12
+        model.setObjective(expr)
+        model.addConstr(x.sum() >= 1)
+        model.optimize()
+        assert model.ObjVal == pytest.approx(2 + 12)
+
+    def test_build_quadratic(self, model):
+        x = model.addVar(lb=1, name="x")
+        parts = [ObjectivePart(weight=2, expr=x * x), ObjectivePart(weight=1, expr=x)]
+        expr = BaseObjective(parts, hierarchy=1).build()
+        assert isinstance(expr, gp.QuadExpr)
+        model.setObjective(expr)
+        model.optimize()
+        assert model.ObjVal == pytest.approx(3)
+
+
+# pylint: disable=no-self-use, redefined-outer-name
+@pytest.mark.unit
+class TestObjective:
+    def test_summary(self, model):
+        x = model.addVars(4, lb=1, name="x")
+        parts = [ObjectivePart(weight=2, expr=x.sum()), ObjectivePart(weight=1, expr=x[0])]
+        objective = Objective([BaseObjective(parts, hierarchy=1)])
+        assert json.loads(repr(objective))["base_objectives"][0]["objective_parts"] == [
+            {"weight": 2, "terms": 4},
+            {"weight": 1, "terms": 1},
+        ]
+        objective.set(model)
+        model.optimize()
+        summary = objective.summary()
+        assert [part["value"] for part in summary["base_objectives"][0]["objective_parts"]] == [4, 1]
+        full = objective.summary(full_expr=True)
+        assert "x[3]" in full["base_objectives"][0]["objective_parts"][0]["expr"]
+
+    def test_set_blends_equal_hierarchies(self, model):
+        x = model.addVar(ub=1, name="x")
+        objective = Objective(
+            [
+                BaseObjective([ObjectivePart(1, x)], hierarchy=1, name="more"),
+                BaseObjective([ObjectivePart(1, x)], hierarchy=1, weight=-2, name="less"),
+            ]
+        )
+        objective.set(model, gp.GRB.MAXIMIZE)
+        model.optimize()
+        priorities = []
+        for index in range(2):
+            model.params.ObjNumber = index
+            priorities.append(model.ObjNPriority)
+        assert priorities == [1, 1]
+        assert x.X == 0  # blended objective -x, lexicographic levels would give 1
@@ -1,8 +1,20 @@
+import asyncio
+import json
+import threading
 from collections import defaultdict
 from random import random, seed
 from itertools import product
 import pytest
 import gurobipy as gp
+import numpy as np
+from src.opt_sugar.low_sugar import (
+    MemoryCache,
+    DiskCache,
+    TieredCache,
+    EnvPool,
+    ModelStore,
+    registry,
+)
 from src.opt_sugar.extra_sugar import (
     OptModel,
     ModelBuilder,
@@ -10,6 +22,7 @@ from src.opt_sugar.extra_sugar import (
     Objective,
     BaseObjective,
 )
+from src.opt_sugar.extra_sugar.matrix import sparse_matrix
 
 
 class ColoringModelBuilder(ModelBuilder):
@@ -65,6 +78,114 @@ class ColoringModelBuilder(ModelBuilder):
         return objective
 
 
+class NameFreeColoringModelBuilder(ColoringModelBuilder):
+    """Creates the variables with ModelBuilder.add_vars, so name-free builds record them
+    in the variable registry"""
+
+    def build_variables(self, base_model):
+        degrees = defaultdict(int)
+        for edge in self.data["edges"]:
+            for node in edge:
+                degrees[node] += 1
+        self.degree = max(degrees.values())
+        color_keys = list(product(self.data["nodes"], range(self.degree)))
+        color = self.add_vars(base_model, color_keys, vtype="B", name="color")
+        max_color = self.add_var(base_model, lb=0, ub=self.degree, vtype="C", name="max_color")
+        self.variables = {"color": color, "max_color": max_color}
+
+
+class MatrixColoringModelBuilder(NameFreeColoringModelBuilder):
+    def build_constraints(self, base_model):
+        color = self.variables["color"]
+        x = [*color.values(), self.variables["max_color"]]
+        column = {key: position for position, key in enumerate(color)}
+        edges = np.array(sorted(self.data["edges"]))
+        colors = np.arange(self.degree)
+        # color[node1, col] + color[node2, col] <= 1 for every edge and color
+        rows = np.arange(len(edges) * self.degree).repeat(2)
+        cols = [
+            column[node, col]
+            for node1, node2 in edges
+            for col in colors
+            for node in (node1, node2)
+        ]
+        shape = (len(edges) * self.degree, len(x))
+        conflicts = sparse_matrix(rows, cols, np.ones(len(rows)), shape)
+        self.add_matrix_constrs(base_model, conflicts, x, "<", 1, name="color")
+
+        nodes = sorted(self.data["nodes"])
+        rows = np.arange(len(nodes)).repeat(self.degree)
+        cols = [column[node, col] for node in nodes for col in colors]
+        every_node = sparse_matrix(rows, cols, np.ones(len(rows)), (len(nodes), len(x)))
+        self.add_matrix_constrs(base_model, every_node, x, "=", 1)
+
+        # col * color[node, col] - max_color <= 0
+        rows = np.arange(len(color)).repeat(2)
+        cols = np.column_stack([np.arange(len(color)), np.full(len(color), len(color))])
+        values = np.column_stack([[col for _, col in color], -np.ones(len(color))])
+        max_color = sparse_matrix(rows, cols.ravel(), values.ravel(), (len(color), len(x)))
+        self.add_matrix_constrs(base_model, max_color, x, "<", 0)
+
+
+class KnapsackModelBuilder(ModelBuilder):
+    def build_variables(self, base_model):
+        self.pick = base_model.addVars(self.data["values"].keys(), vtype="B", name="pick")
+
+    def build_constraints(self, base_model):
+        capacity = base_model.addConstr(
+            self.pick.prod(self.data["weights"]) <= self.data["capacity"], name="capacity"
+        )
+        self.bind(base_model, "RHS", [capacity], lambda data: [data["capacity"]])
+
+    def build_objective(self, base_model):
+        objective_parts = [ObjectivePart(weight=1, expr=self.pick.prod(self.data["values"]))]
+        objective = Objective([BaseObjective(objective_parts, hierarchy=1)])
+        base_model.setObjective(objective.build()[0], gp.GRB.MAXIMIZE)
+        return objective
+
+
+class PreferredItemKnapsackModelBuilder(KnapsackModelBuilder):
+    def build_objective(self, base_model):
+        preferred = [ObjectivePart(weight=1, expr=self.pick[self.data["preferred"]])]
+        value = [ObjectivePart(weight=1, expr=self.pick.prod(self.data["values"]))]
+        objective = Objective(
+            [BaseObjective(value, hierarchy=2), BaseObjective(preferred, hierarchy=1)]
+        )
+        objective.set(base_model, gp.GRB.MAXIMIZE)
+        return objective
+
+
+class BlendedKnapsackModelBuilder(KnapsackModelBuilder):
+    def build_objective(self, base_model):
+        weights = {item: -weight for item, weight in self.data["weights"].items()}
+        objective_parts = [
+            ObjectivePart(weight=1, expr=self.pick.prod(self.data["values"])),
+            ObjectivePart(weight=0, expr=self.pick.prod(weights)),
+        ]
+        objective = Objective([BaseObjective(objective_parts, hierarchy=1)])
+        objective.set(base_model, gp.GRB.MAXIMIZE)
+        return objective
+
+
+class RelaxedKnapsackModelBuilder(KnapsackModelBuilder):
+    def build_variables(self, base_model):
+        self.pick = base_model.addVars(self.data["values"].keys(), ub=1, name="pick")
+
+
+def stop_at_first_solution(model, where):
+    if where == gp.GRB.Callback.MIPSOL:
+        model.terminate()
+
+
+@pytest.fixture
+def knapsack_data():
+    return {
+        "values": {"a": 6, "b": 5, "c": 4},
+        "weights": {"a": 3, "b": 2, "c": 2},
+        "capacity": 4,
+    }
+
+
 @pytest.fixture
 def five_node_data():
     node_count = 5
@@ -91,6 +212,25 @@ class TestOptModel:
         color_count = opt_model.objective_value_ + 1
         assert color_count == 2
 
+    def test_not_fitted(self):
+        # check_is_fitted (used by score) looks for attributes ending with "_"
+        opt_model = OptModel(model_builder=ColoringModelBuilder, profile=True)
+        assert not [name for name in vars(opt_model) if name.endswith("_")]
+
+    def test_fit_callback_error(self, five_node_data):
+        opt_model = OptModel(model_builder=ColoringModelBuilder, profile=True)
+        opt_model.fit(five_node_data)
+        assert hasattr(opt_model, "profile_")
+        with pytest.raises(AttributeError):
+            opt_model.fit(five_node_data, callback=lambda model: model.Unknown)
+        # a failed fit leaves nothing check_is_fitted would accept, not even profile_
+        assert not [name for name in vars(opt_model) if name.endswith("_")]
+
+    def test_no_profile(self, five_node_data):
+        opt_model = OptModel(model_builder=ColoringModelBuilder)
+        opt_model.fit(five_node_data)
+        assert not hasattr(opt_model, "profile_")
+
     def test_predict(self, five_node_data):
         opt_model = OptModel(model_builder=ColoringModelBuilder)
         vars_ = opt_model.predict(five_node_data)
@@ -98,3 +238,250 @@ class TestOptModel:
         # color count is 2
         color_count = opt_model.objective_value_ + 1
         assert color_count == 2
+
+    def test_fit_matrix_constraints(self, five_node_data):
+        opt_model = OptModel(model_builder=MatrixColoringModelBuilder)
+        opt_model.fit(five_node_data)
+        assert opt_model.objective_value_ + 1 == 2
+        colored = [value for name, value in opt_model.vars_.items() if name.startswith("color")]
+        assert sum(colored) == len(five_node_data["nodes"])
+
+    def test_fit_name_free(self, five_node_data):
+        opt_model = OptModel(
+            model_builder=MatrixColoringModelBuilder, var_names=False, keep_model=True
+        )
+        opt_model.fit(five_node_data)
+        assert opt_model.vars_["max_color"] == opt_model.objective_value_ == 1
+        assert sum(opt_model.vars_["color"].values()) == len(five_node_data["nodes"])
+        assert (4, 0) in opt_model.vars_["color"]
+        first_var = opt_model.model.getVars()[0]
+        assert first_var.VarName == "C0"
+        registry.apply_names(opt_model.model)
+        assert first_var.VarName == "color[0,0]"
+        columnar = OptModel(
+            model_builder=MatrixColoringModelBuilder, var_names=False, result_format="columnar"
+        ).fit(five_node_data)
+        assert columnar.vars_["color"].to_dict() == opt_model.vars_["color"]
+
+    def test_solution_pool(self, five_node_data):
+        params = {"PoolSearchMode": 2, "PoolSolutions": 4}
+        opt_model = OptModel(model_builder=ColoringModelBuilder, pool_size=10)
+        opt_model.fit(five_node_data, params=params)
+        pool = opt_model.solution_pool_
+        assert len(pool) == 4
+        assert pool[0] == pytest.approx(opt_model.vars_)
+        assert [solution["max_color"] for solution in pool] == pytest.approx(
+            pool.objective_values
+        )
+        name_free = OptModel(
+            model_builder=NameFreeColoringModelBuilder, var_names=False, pool_size=2
+        )
+        name_free.fit(five_node_data, params=params)
+        assert name_free.solution_pool_[1]["color"].keys() == name_free.vars_["color"].keys()
+
+    def test_sensitivity(self, knapsack_data):
+        opt_model = OptModel(model_builder=RelaxedKnapsackModelBuilder, sensitivity=True)
+        opt_model.fit(knapsack_data)
+        assert opt_model.sensitivity_["constrs"]["Pi"]["capacity"] == pytest.approx(2)
+        assert opt_model.sensitivity_["vars"]["RC"]["pick"].to_dict()[("b",)] == 1
+        assert opt_model.sensitivity_["constrs"]["SARHSUp"]["capacity"] >= 4
+
+    def test_sensitivity_mip(self, knapsack_data):
+        opt_model = OptModel(model_builder=KnapsackModelBuilder, sensitivity=True)
+        assert opt_model.predict(knapsack_data) == {"pick[a]": 0, "pick[b]": 1, "pick[c]": 1}
+        assert opt_model.sensitivity_ is None
+
+    def test_sweep_params(self, knapsack_data):
+        opt_model = OptModel(model_builder=KnapsackModelBuilder)
+        table = opt_model.sweep_params([knapsack_data], [{"Method": 0}, {"Method": 1}], cores=2)
+        assert list(table["Method"]) == [0, 1]
+        assert table["objective"] == pytest.approx([9, 9])
+
+    def test_race(self, five_node_data):
+        opt_model = OptModel(model_builder=ColoringModelBuilder)
+        opt_model.race(five_node_data, [{"MIPFocus": 1}, {"MIPFocus": 3}], cores=2)
+        assert opt_model.objective_value_ == opt_model.vars_["max_color"] == 1
+        assert opt_model.race_["winner"] in (0, 1)
+        opt_model.race(five_node_data, [{"TimeLimit": 0}], cores=1)
+        assert not hasattr(opt_model, "vars_")
+        assert opt_model.race_["status"] == gp.GRB.TIME_LIMIT
+
+    def test_profile(self, five_node_data, tmp_path):
+        opt_model = OptModel(model_builder=ColoringModelBuilder, profile=True)
+        opt_model.fit(five_node_data)
+        profile = opt_model.profile_.summary()
+        assert list(profile) == [
+            "build_variables",
+            "build_constraints",
+            "build_objective",
+            "optimize",
+            "extract",
+        ]
+        assert profile["build_variables"]["num_constrs"] == 0
+        assert profile["build_constraints"]["num_constrs"] > 0
+        assert profile["build_constraints"]["python_peak"] > 0
+        trace = opt_model.profile_.to_chrome_trace(tmp_path / "trace.json")
+        assert json.loads((tmp_path / "trace.json").read_text()) == trace
+        assert [event["ph"] for event in trace["traceEvents"]] == ["X"] * 5
+        timed = OptModel(model_builder=ColoringModelBuilder, profile="time").fit(five_node_data)
+        assert timed.profile_.summary()["build_constraints"]["python_peak"] is None
+
+    def test_model_store(self, five_node_data, tmp_path):
+        store = ModelStore(tmp_path)
+        built = OptModel(model_builder=MatrixColoringModelBuilder, model_store=store)
+        built.fit(five_node_data)
+        loaded = OptModel(
+            model_builder=MatrixColoringModelBuilder, model_store=store, profile=True
+        ).fit(five_node_data)
+        assert store.stats()["hits"] == 1
+        assert "build_constraints" not in loaded.profile_.summary()
+        assert loaded.vars_ == built.vars_
+        assert loaded.objective == built.objective
+        name_free = OptModel(
+            model_builder=MatrixColoringModelBuilder, model_store=store, var_names=False
+        )
+        name_free.fit(five_node_data)
+        name_free.fit(five_node_data)
+        assert store.stats() == {"hits": 2, "misses": 2, "hit_rate": 0.5}
+        assert name_free.vars_["max_color"] == 1
+
+    def test_fit_columnar(self, five_node_data):
+        opt_model = OptModel(model_builder=ColoringModelBuilder, result_format="columnar")
+        opt_model.fit(five_node_data)
+        assert opt_model.vars_["color"].values.sum() == len(five_node_data["nodes"])
+        assert opt_model.vars_["max_color"] == opt_model.objective_value_
+
+    def test_fit_many(self, five_node_data):
+        opt_model = OptModel(model_builder=ColoringModelBuilder)
+        fitted = opt_model.fit_many([five_node_data, five_node_data], max_workers=2)
+        assert [model.objective_value_ for model in fitted] == [1, 1]
+
+    def test_keep_model(self, knapsack_data):
+        opt_model = OptModel(model_builder=KnapsackModelBuilder, keep_model=True)
+        opt_model.fit(knapsack_data)
+        assert opt_model.objective_value_ == 9
+        model = opt_model.model
+        opt_model.fit({**knapsack_data, "capacity": 5})
+        assert opt_model.model is model
+        assert opt_model.objective_value_ == 11
+
+    def test_aoptimize(self, knapsack_data):
+        opt_model = OptModel(model_builder=KnapsackModelBuilder)
+        fitted = asyncio.run(opt_model.aoptimize(knapsack_data))
+        assert fitted.objective_value_ == 9
+
+    def test_cache(self, knapsack_data, tmp_path):
+        cache = TieredCache(MemoryCache(max_items=2), DiskCache(tmp_path))
+        OptModel(model_builder=KnapsackModelBuilder, cache=cache).fit(knapsack_data)
+        opt_model = OptModel(model_builder=KnapsackModelBuilder, cache=cache)
+        opt_model.fit(dict(reversed(list(knapsack_data.items()))))
+        assert opt_model.objective_value_ == 9
+        assert cache.stats()["hits"] == 1
+
+        disk_only = OptModel(model_builder=KnapsackModelBuilder, cache=DiskCache(tmp_path))
+        disk_only.fit(knapsack_data)
+        assert disk_only.cache.stats()["hits"] == 1
+        assert disk_only.vars_ == opt_model.vars_
+
+    def test_cache_only_optimal(self, knapsack_data):
+        opt_model = OptModel(model_builder=KnapsackModelBuilder, cache=MemoryCache())
+        for _ in range(2):
+            opt_model.fit(knapsack_data, solve_callback=stop_at_first_solution)
+            assert opt_model.vars_
+        assert opt_model.cache.stats()["hits"] == 0
+
+    def test_env_pool(self, knapsack_data):
+        env_pool = EnvPool(size=1, params={"OutputFlag": 0})
+        opt_model = OptModel(model_builder=KnapsackModelBuilder, env_pool=env_pool)
+        opt_model.fit(knapsack_data)
+        opt_model.fit({**knapsack_data, "capacity": 5})
+        assert opt_model.objective_value_ == 11
+        assert env_pool.metrics()["acquisitions"] == 2
+        env_pool.close()
+
+    def test_log_capture(self, five_node_data, tmp_path):
+        opt_model = OptModel(model_builder=ColoringModelBuilder)
+        opt_model.fit(five_node_data)
+        assert opt_model.log_results is None
+        assert set(opt_model.nodelog_progress) >= {"time", "incumbent", "bound", "gap"}
+
+        log_file = tmp_path / "coloring.log"
+        for _ in range(2):
+            opt_model.fit(five_node_data, log_file=str(log_file))
+        assert opt_model.log_results is not None
+        assert log_file.read_text().count("Optimize a model") == 1
+
+    def test_predict_data_key(self, knapsack_data):
+        opt_model = OptModel(model_builder=KnapsackModelBuilder)
+        opt_model.predict(knapsack_data)
+        opt_model.predict(dict(knapsack_data))  # equal data, no refit
+        assert opt_model.data is knapsack_data
+        opt_model.predict({**knapsack_data, "capacity": 5})
+        assert opt_model.objective_value_ == 11
+
+        versioned = OptModel(
+            model_builder=KnapsackModelBuilder, data_key=lambda data: data["capacity"]
+        )
+        versioned.predict(knapsack_data)
+        versioned.predict({**knapsack_data, "values": {"a": 1, "b": 1, "c": 1}})
+        assert versioned.objective_value_ == 9
+
+        hashed = OptModel(model_builder=KnapsackModelBuilder, data_key="hash")
+        hashed.predict(knapsack_data)
+        assert hashed._data_key is None  # only hashed when predict compares
+        hashed.predict(dict(reversed(list(knapsack_data.items()))))
+        assert hashed.data is knapsack_data
+        knapsack_data["capacity"] = 5  # in place changes are detected
+        hashed.predict(knapsack_data)
+        assert hashed.objective_value_ == 11
+
+    def test_unhashable_data(self, knapsack_data):
+        data = {**knapsack_data, "lock": threading.Lock()}
+        opt_model = OptModel(model_builder=KnapsackModelBuilder, cache=MemoryCache())
+        for _ in range(2):
+            opt_model.fit(data)
+        assert opt_model.objective_value_ == 9
+        assert opt_model.cache.stats()["misses"] == 0
+
+    def test_hierarchical_objective(self, knapsack_data):
+        data = {**knapsack_data, "capacity": 5, "preferred": "c"}
+        opt_model = OptModel(model_builder=PreferredItemKnapsackModelBuilder)
+        opt_model.fit(data)
+        assert opt_model.objective_values_ == [1, 10]
+        assert len(opt_model.objective_runtimes_) == 2
+
+    def test_sweep_weights(self, knapsack_data):
+        opt_model = OptModel(model_builder=BlendedKnapsackModelBuilder)
+        part_values = opt_model.sweep_weights(knapsack_data, [(1, 0), (1, 10), (1, 1)])
+        assert part_values.tolist() == [[9, -4], [0, 0], [9, -4]]
+
+    def test_sweep_weights_keep_model(self, knapsack_data):
+        opt_model = OptModel(model_builder=BlendedKnapsackModelBuilder, keep_model=True)
+        opt_model.fit(knapsack_data)
+        assert opt_model.objective_value_ == pytest.approx(9)
+        opt_model.sweep_weights(knapsack_data, [(1, 10)])
+        opt_model.fit(knapsack_data)
+        assert opt_model.objective_value_ == pytest.approx(9)
+
+    def test_pareto_frontier(self, knapsack_data):
+        opt_model = OptModel(model_builder=BlendedKnapsackModelBuilder)
+        supported = opt_model.pareto_frontier(knapsack_data, n_points=5)
+        assert supported.tolist() == [[0, 0], [5, -2], [9, -4]]
+        # epsilon constraints also find points inside the convex hull, like (6, -3)
+        frontier = opt_model.pareto_frontier(knapsack_data, n_points=5, method="epsilon")
+        assert frontier.tolist() == [[0, 0], [5, -2], [6, -3], [9, -4]]
+        parallel_frontier = opt_model.pareto_frontier(
+            knapsack_data, n_points=5, method="epsilon", processes=2
+        )
+        assert parallel_frontier.tolist() == frontier.tolist()
+
+    def test_pareto_frontier_keep_model(self, knapsack_data):
+        data = {**knapsack_data, "capacity": 5, "preferred": "c"}
+        for builder, objective_values in (
+            (PreferredItemKnapsackModelBuilder, [1, 10]),
+            (BlendedKnapsackModelBuilder, [11]),
+        ):
+            opt_model = OptModel(model_builder=builder, keep_model=True)
+            opt_model.pareto_frontier(data, n_points=3)
+            opt_model.fit(data)
+            assert opt_model.objective_values_ == objective_values